@@ -0,0 +1,75 @@
+"""
+Latency benchmark for the in-memory employee search index.
+
+Builds a directory of synthetic employees with a fixed seed (same name,
+department and email shapes as generate_dataset.py) and times a set of
+typeahead queries. "cold" is the first run of a query: broad prefixes are
+already cached by build(), narrower ones are not yet; "median"/"p99" are
+over the following repeats.
+
+    python bench_employee_search.py --employees 50000
+"""
+import random
+import statistics
+import time
+
+import typer
+
+from employee_search import EmployeeSearchIndex
+from generate_dataset import DEPARTMENTS, EMAIL_DOMAIN, FIRST_NAMES, LAST_NAMES
+
+
+QUERIES = [
+    "a", "sa", "sara", "potn", "syn0001", "sara shah", "sara s", "priya khan",
+    "sara shah legal", "kiran nair sales", "anil lalw", "sahrma", "potnaru",
+]
+
+app = typer.Typer(add_completion=False)
+
+
+def synthetic_employees(count: int, seed: int):
+    rng = random.Random(seed)
+    for index in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield {
+            "id": f"{index:08d}",
+            "full_name": f"{first} {last}",
+            "employee_id": f"SYN{index + 1:06d}",
+            "email": f"{first}.{last}.{index + 1}@{EMAIL_DOMAIN}".lower().replace(" ", ""),
+            "department": rng.choice(DEPARTMENTS),
+            "status": rng.choice(("Active", "Active", "Active", "Suspended", "Terminated")),
+        }
+
+
+@app.command()
+def bench(
+    employees: int = typer.Option(50000, min=1),
+    seed: int = typer.Option(42),
+    repeats: int = typer.Option(200, min=1),
+    limit: int = typer.Option(20, min=1),
+):
+    index = EmployeeSearchIndex()
+    started = time.perf_counter()
+    index.build(synthetic_employees(employees, seed))
+    typer.echo(f"Built index over {len(index):,} employees in {time.perf_counter() - started:.2f}s")
+
+    typer.echo(f"{'query':<20}{'hits':>6}{'cold ms':>10}{'median ms':>11}{'p99 ms':>9}")
+    for query in QUERIES:
+        started = time.perf_counter()
+        hits = len(index.search(query, limit=limit))
+        cold = time.perf_counter() - started
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            index.search(query, limit=limit)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        typer.echo(
+            f"{query:<20}{hits:>6}{cold * 1000:>10.3f}"
+            f"{statistics.median(timings) * 1000:>11.3f}{p99 * 1000:>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,463 @@
+import bisect
+import heapq
+import re
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+# Fields of an employee document that are searchable
+SEARCH_FIELDS = ("full_name", "employee_id", "email", "department")
+
+# Only these fields are kept in memory and returned from the index
+STORED_FIELDS = ("id", "full_name", "employee_id", "email", "department", "status")
+
+# Exact-match filters backed by their own id sets
+FILTER_FIELDS = ("status", "department")
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Score weights per kind of term match
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+TYPO_SCORE = 1.0
+TRIGRAM_SCORE = 1.0
+MIN_TRIGRAM_SIMILARITY = 0.4
+
+# Trigrams shared by more tokens than this are too common to narrow down
+# fuzzy candidates
+MAX_GRAM_TOKENS = 500
+
+# Prefix match sets at least this large are cached, with their name order,
+# and kept up to date on upsert/remove so broad typeahead prefixes like "a"
+# or "sa" stay cheap
+PREFIX_CACHE_MIN_IDS = 1000
+PREFIX_CACHE_SIZE = 64
+
+# Prefixes spanning several tokens and at least this many postings are
+# cached by build() itself, on the builder's thread. Sorting them on the
+# first query instead would stall the event loop for hundreds of
+# milliseconds at 100k employees ("s", "syn"). These entries are never
+# evicted
+WARM_PREFIX_MIN_IDS = 5000
+
+# Ranking sorts result tiers up to this size; larger ones are read off a
+# name-ordered list instead
+SORT_LIMIT = 1000
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+# (full_name, id): the tie-break order within equal scores
+SortKey = Tuple[str, str]
+
+# (score, ids, the same ids as sort keys in name order if available)
+Group = Tuple[float, Set[str], Optional[List[SortKey]]]
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def deletes(token: str) -> Set[str]:
+    """Every variant of ``token`` with one character removed."""
+    return {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True when ``a`` and ``b`` differ by one insertion, deletion, substitution or adjacent swap."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    if a[i + 1:] == b[i + 1:]:
+        return True
+    # Adjacent transposition
+    return a[i:i + 2] == b[i + 1:i + 2] + b[i:i + 1] and a[i + 2:] == b[i + 2:]
+
+
+def _typo_candidate(token: str) -> bool:
+    # Codes and numbers are copied, not typed from memory; keep them out of
+    # the delete index
+    return len(token) >= 3 and token.isalpha()
+
+
+def _discard_key(keys: List[SortKey], key: SortKey):
+    pos = bisect.bisect_left(keys, key)
+    if pos < len(keys) and keys[pos] == key:
+        del keys[pos]
+
+
+class EmployeeSearchIndex:
+    """In-memory prefix/trigram index over employee name, code, email and department.
+
+    Tokens are kept in a sorted list so a prefix lookup is a bisect over the
+    vocabulary. A query term with no prefix hit falls back to fuzzy matching:
+    tokens one edit away (including swapped letters), else tokens with a high
+    trigram overlap. Every term of a query must match; the full match sets
+    are intersected before anything is cut to ``limit``.
+
+    Each token's postings are also kept in name order, which lets a broad
+    term return its first ``limit`` hits without sorting all of them.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._docs: Dict[str, dict] = {}
+        self._doc_tokens: Dict[str, Set[str]] = {}
+        self._sort_keys: Dict[str, SortKey] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._ordered: Dict[str, List[SortKey]] = {}
+        self._vocabulary: List[str] = []
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._deletes: Dict[str, Set[str]] = {}
+        self._filters: Dict[str, Dict[str, Set[str]]] = {field: {} for field in FILTER_FIELDS}
+        self._prefix_cache: Dict[str, Tuple[Set[str], List[SortKey]]] = {}
+        self._warm_prefixes: Set[str] = set()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def build(self, employees: Iterable[dict]):
+        self.__init__()
+        for employee in employees:
+            self._add(employee)
+        self._vocabulary = sorted(self._postings)
+        # Sorting ints is much cheaper than comparing name tuples, so each id
+        # set is ordered through its ids' positions in the overall name order
+        in_order = sorted(self._sort_keys.values())
+        rank = {key[1]: position for position, key in enumerate(in_order)}
+
+        def in_name_order(ids: Set[str]) -> List[SortKey]:
+            return list(map(in_order.__getitem__, sorted(map(rank.__getitem__, ids))))
+
+        self._ordered = {token: in_name_order(ids) for token, ids in self._postings.items()}
+        self._warm_prefix_cache(in_name_order)
+        self.ready = True
+
+    def _warm_prefix_cache(self, in_name_order: Callable[[Set[str]], List[SortKey]]):
+        """Cache every broad multi-token prefix up front; see WARM_PREFIX_MIN_IDS.
+
+        Tokens sharing a prefix are a contiguous run of the sorted
+        vocabulary, so each prefix is a range whose posting count comes from
+        running totals; only the broad ranges are split one character further.
+        """
+        vocabulary = self._vocabulary
+        totals = [0]
+        for token in vocabulary:
+            totals.append(totals[-1] + len(self._postings[token]))
+
+        ranges = [(0, len(vocabulary))]
+        length = 1
+        while ranges:
+            broad = []
+            for start, stop in ranges:
+                # Only the run's own shorter prefix can be too short, and it sorts first
+                if start < stop and len(vocabulary[start]) < length:
+                    start += 1
+                while start < stop:
+                    prefix = vocabulary[start][:length]
+                    # "{" sorts after every token character
+                    end = bisect.bisect_left(vocabulary, prefix + "{", start, stop)
+                    if totals[end] - totals[start] >= WARM_PREFIX_MIN_IDS:
+                        broad.append((start, end))
+                        if end - start > 1:
+                            self._warm_prefix(prefix, vocabulary[start:end], in_name_order)
+                    start = end
+            ranges = broad
+            length += 1
+
+    def _warm_prefix(self, prefix: str, tokens: List[str], in_name_order: Callable[[Set[str]], List[SortKey]]):
+        ids = set().union(*(self._postings[token] for token in tokens))
+        if len(ids) >= WARM_PREFIX_MIN_IDS:
+            self._prefix_cache[prefix] = (ids, in_name_order(ids))
+            self._warm_prefixes.add(prefix)
+
+    def upsert(self, employee: dict):
+        """Add or re-index a single employee after a create, update or status change."""
+        employee_id = employee["id"]
+        previous = self._docs.get(employee_id)
+        if previous is not None and all(previous.get(field) == employee.get(field) for field in SEARCH_FIELDS):
+            # Tokens and name order are unchanged (a status change): only the
+            # stored fields and filter sets need updating
+            self._unfilter(employee_id, previous)
+            doc = self._docs[employee_id] = {field: employee.get(field) for field in STORED_FIELDS}
+            self._filter(employee_id, doc)
+            return
+
+        self.remove(employee_id)
+        key = None
+        for token in self._add(employee):
+            key = self._sort_keys[employee_id]
+            if token not in self._ordered:
+                bisect.insort(self._vocabulary, token)
+                self._ordered[token] = []
+            bisect.insort(self._ordered[token], key)
+            for prefix in self._cached_prefixes(token):
+                ids, keys = self._prefix_cache[prefix]
+                if employee_id not in ids:
+                    ids.add(employee_id)
+                    bisect.insort(keys, key)
+
+    def remove(self, employee_id: str):
+        if employee_id not in self._docs:
+            return
+        doc = self._docs.pop(employee_id)
+        key = self._sort_keys.pop(employee_id)
+        self._unfilter(employee_id, doc)
+
+        for token in self._doc_tokens.pop(employee_id):
+            for prefix in self._cached_prefixes(token):
+                ids, keys = self._prefix_cache[prefix]
+                if employee_id in ids:
+                    ids.discard(employee_id)
+                    _discard_key(keys, key)
+            ids = self._postings[token]
+            ids.discard(employee_id)
+            _discard_key(self._ordered[token], key)
+            if ids:
+                continue
+            del self._postings[token]
+            del self._ordered[token]
+            pos = bisect.bisect_left(self._vocabulary, token)
+            if pos < len(self._vocabulary) and self._vocabulary[pos] == token:
+                del self._vocabulary[pos]
+            for index, variants in ((self._trigrams, trigrams(token)), (self._deletes, self._delete_keys(token))):
+                for variant in variants:
+                    tokens = index.get(variant)
+                    if tokens is not None:
+                        tokens.discard(token)
+                        if not tokens:
+                            del index[variant]
+
+    def _filter(self, employee_id: str, doc: dict):
+        for field in FILTER_FIELDS:
+            self._filters[field].setdefault(doc.get(field), set()).add(employee_id)
+
+    def _unfilter(self, employee_id: str, doc: dict):
+        for field in FILTER_FIELDS:
+            ids = self._filters[field].get(doc.get(field))
+            if ids is not None:
+                ids.discard(employee_id)
+                if not ids:
+                    del self._filters[field][doc.get(field)]
+
+    def _cached_prefixes(self, token: str) -> List[str]:
+        if not self._prefix_cache:
+            return []
+        return [token[:end] for end in range(1, len(token) + 1) if token[:end] in self._prefix_cache]
+
+    @staticmethod
+    def _delete_keys(token: str) -> Set[str]:
+        if not _typo_candidate(token):
+            return set()
+        return deletes(token) | {token}
+
+    def _add(self, employee: dict) -> Set[str]:
+        employee_id = employee["id"]
+        doc = {field: employee.get(field) for field in STORED_FIELDS}
+        tokens = set()
+        for field in SEARCH_FIELDS:
+            tokens.update(tokenize(employee.get(field)))
+        self._docs[employee_id] = doc
+        self._doc_tokens[employee_id] = tokens
+        self._sort_keys[employee_id] = (doc.get("full_name") or "", employee_id)
+        self._filter(employee_id, doc)
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = set()
+                for gram in trigrams(token):
+                    self._trigrams.setdefault(gram, set()).add(token)
+                for key in self._delete_keys(token):
+                    self._deletes.setdefault(key, set()).add(token)
+            ids.add(employee_id)
+        return tokens
+
+    def _prefix_group(self, term: str) -> Optional[Group]:
+        """Ids with a token starting with ``term``, or None when no token does."""
+        cached = self._prefix_cache.get(term)
+        if cached and cached[0]:
+            return (PREFIX_SCORE, *cached)
+
+        start = bisect.bisect_left(self._vocabulary, term)
+        stop = start
+        while stop < len(self._vocabulary) and self._vocabulary[stop].startswith(term):
+            stop += 1
+        if stop == start:
+            return None
+        if stop == start + 1:
+            token = self._vocabulary[start]
+            return PREFIX_SCORE, self._postings[token], self._ordered[token]
+
+        tokens = self._vocabulary[start:stop]
+        ids = set().union(*(self._postings[token] for token in tokens))
+        if len(ids) < PREFIX_CACHE_MIN_IDS:
+            return PREFIX_SCORE, ids, None
+        keys = sorted(map(self._sort_keys.__getitem__, ids))
+        evictable = [prefix for prefix in self._prefix_cache if prefix not in self._warm_prefixes]
+        if len(evictable) >= PREFIX_CACHE_SIZE:
+            del self._prefix_cache[evictable[0]]
+        self._prefix_cache[term] = (ids, keys)
+        return PREFIX_SCORE, ids, keys
+
+    def _fuzzy_groups(self, term: str) -> List[Group]:
+        """Ids with a token close to ``term``, grouped by score, best first.
+
+        Tokens one edit away win; trigram overlap is only consulted when
+        there are none, for longer misspellings and mid-word fragments.
+        """
+        similar: Dict[str, float] = {}
+
+        if _typo_candidate(term):
+            for key in deletes(term) | {term}:
+                for token in self._deletes.get(key, ()):
+                    if within_one_edit(term, token):
+                        similar[token] = TYPO_SCORE
+
+        if not similar:
+            query_grams = trigrams(term)
+            candidates: Set[str] = set()
+            for gram in query_grams:
+                tokens = self._trigrams.get(gram, ())
+                if len(tokens) <= MAX_GRAM_TOKENS:
+                    candidates.update(tokens)
+            for token in candidates:
+                token_grams = trigrams(token)
+                similarity = len(query_grams & token_grams) / len(query_grams | token_grams)
+                if similarity >= MIN_TRIGRAM_SIMILARITY:
+                    similar[token] = TRIGRAM_SCORE * similarity
+
+        by_score: Dict[float, List[str]] = {}
+        for token, score in similar.items():
+            by_score.setdefault(score, []).append(token)
+        groups = []
+        for score in sorted(by_score, reverse=True):
+            tokens = by_score[score]
+            if len(tokens) == 1:
+                groups.append((score, self._postings[tokens[0]], self._ordered[tokens[0]]))
+            else:
+                groups.append((score, set().union(*(self._postings[token] for token in tokens)), None))
+        return groups
+
+    def _take_in_order(
+        self, ids, ordered: Optional[List[SortKey]], keep: Callable[[str], bool], count: int
+    ) -> List[SortKey]:
+        """The first ``count`` sort keys of ``ids`` that pass ``keep``.
+
+        ``ordered`` must list a superset of ``ids`` in name order; reading it
+        is much cheaper than sorting when ``ids`` is large.
+        """
+        if ordered is None or len(ids) <= SORT_LIMIT:
+            return heapq.nsmallest(count, (self._sort_keys[i] for i in ids if keep(i)))
+        taken = []
+        for key in ordered:
+            if key[1] in ids and keep(key[1]):
+                taken.append(key)
+                if len(taken) >= count:
+                    break
+        return taken
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        status: Optional[str] = None,
+        department: Optional[str] = None,
+    ) -> List[dict]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        # Per term: all matching ids and the score groups (best first). Prefix
+        # terms score an exact token above a plain prefix
+        matches: List[Tuple[Set[str], List[Group]]] = []
+        for term in terms:
+            prefix = self._prefix_group(term)
+            if prefix is not None:
+                exact = (EXACT_SCORE, self._postings.get(term, _EMPTY), self._ordered.get(term))
+                matches.append((prefix[1], [exact, prefix]))
+                continue
+            groups = self._fuzzy_groups(term) if len(term) >= 3 else []
+            if not groups:
+                return []
+            matches.append((set().union(*(ids for _, ids, _ in groups)), groups))
+
+        match_sets = [ids for ids, _ in matches]
+        for field, value in zip(FILTER_FIELDS, (status, department)):
+            if value:
+                match_sets.append(self._filters[field].get(value, _EMPTY))
+
+        # Intersect the full match sets, smallest first
+        match_sets.sort(key=len)
+        candidates = match_sets[0]
+        if len(match_sets) > 1:
+            candidates = set(candidates).intersection(*match_sets[1:])
+        if not candidates:
+            return []
+
+        ranked: List[Tuple[float, SortKey]] = []
+        if len(matches) == 1:
+            # Single term, the common typeahead case: fill from the best score
+            # group down, each group in name order
+            taken: Set[str] = set()
+            for score, ids, ordered in matches[0][1]:
+                tier = ids if candidates is matches[0][0] else candidates.intersection(ids)
+                keys = self._take_in_order(tier, ordered, lambda i: i not in taken, limit - len(ranked))
+                ranked.extend((-score, key) for key in keys)
+                taken.update(key[1] for key in keys)
+                if len(ranked) >= limit:
+                    break
+            return self._results(ranked)
+
+        if any(groups[0][0] != EXACT_SCORE for _, groups in matches):
+            # Some term matched fuzzily: scores vary per id, so score them all
+            def score(employee_id: str) -> float:
+                total = 0.0
+                for _, groups in matches:
+                    for group_score, ids, _ in groups:
+                        if employee_id in ids:
+                            total += group_score
+                            break
+                return total
+
+            ranked = heapq.nsmallest(limit, ((-score(i), self._sort_keys[i]) for i in candidates))
+            return self._results(ranked)
+
+        # All prefix terms: the score only depends on how many terms hit an
+        # exact token, so split the ids with any exact hit into tiers by that
+        # count and read every tier, then the rest, in name order. The
+        # narrowest term's prefix group lists all candidates in order
+        _, groups = min(matches, key=lambda match: len(match[0]))
+        ordered = groups[1][2]
+        exact_sets = [candidates.intersection(groups[0][1]) for _, groups in matches]
+        boosted = set().union(*exact_sets)
+        tiers = [boosted]  # tiers[k]: ids with k exact hits among the terms seen so far
+        for exact in exact_sets:
+            tiers = [
+                (tiers[k] - exact if k < len(tiers) else set()) | (tiers[k - 1] & exact if k else set())
+                for k in range(len(tiers) + 1)
+            ]
+        tiers[0] = candidates
+        base = PREFIX_SCORE * len(matches)
+        for hits in range(len(matches), -1, -1):
+            keep = (lambda i: i not in boosted) if hits == 0 else (lambda i: True)
+            keys = self._take_in_order(tiers[hits], ordered, keep, limit - len(ranked))
+            ranked.extend((-(base + hits * (EXACT_SCORE - PREFIX_SCORE)), key) for key in keys)
+            if len(ranked) >= limit:
+                break
+        return self._results(ranked)
+
+    def _results(self, ranked: List[Tuple[float, SortKey]]) -> List[dict]:
+        return [{**self._docs[employee_id], "score": -neg_score} for neg_score, (_, employee_id) in ranked]
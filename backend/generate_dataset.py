@@ -0,0 +1,666 @@
+"""
+Synthetic dataset generator for scale testing.
+
+Creates N employees with users, attendance, leaves, salary periods,
+document metadata and audit logs over Y years and writes them to the
+PostgreSQL database the Node API serves (DATABASE_URL) with batched COPY.
+Status checks belong to this service's /api/status and go to MongoDB
+instead, when MONGO_URL and DB_NAME are set. Generation is CPU bound, so
+employees are split into chunks across a process pool; each process
+generates on one thread while a second one runs its COPYs.
+
+    python generate_dataset.py --employees 100000 --years 2 --seed 42
+
+The same seed, employee count, years and end date always produce the same
+data, password hashes included, whatever the number of processes.
+Synthetic users are recognised by their ``synthetic.dllc.com`` email
+domain, which never collides with the demo users, and status checks by
+``synthetic: true``. The command refuses to load on top of an earlier
+synthetic load; ``--reset`` removes it first. It relies on the schema's
+own keys and indexes (init-db.js) and leaves them in place, unless
+``--fast`` is given: then the non-unique indexes and foreign keys of the
+loaded tables are dropped for the load and rebuilt in one pass after it,
+which is quicker than maintaining them row by row. The employee search
+trigger is off during the load; server.py is told to rebuild its index
+once at the end.
+"""
+import base64
+import math
+import os
+import random
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import bcrypt
+import psycopg
+import typer
+from dotenv import load_dotenv
+from psycopg.types.json import Jsonb
+from pymongo import ASCENDING, MongoClient
+
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+EMAIL_DOMAIN = "synthetic.dllc.com"
+DEFAULT_END_DATE = "2025-12-31"
+DEFAULT_PASSWORD = "demo123"
+
+# Postgres tables and the columns written, parents before children so every
+# COPY batch satisfies the foreign keys
+TABLES = {
+    "users": ("id", "email", "password_hash", "role", "created_at"),
+    "employees": (
+        "id", "user_id", "full_name", "employee_id", "department", "phone", "join_date", "status", "notes",
+        "created_at",
+    ),
+    "attendance": ("id", "employee_id", "date", "check_in", "check_out", "created_at"),
+    "leaves": (
+        "id", "employee_id", "leave_type", "start_date", "end_date", "reason", "document_url", "status",
+        "approved_by", "comments", "created_at",
+    ),
+    "salary_payroll": (
+        "id", "employee_id", "basic", "allowances", "deductions", "net", "period", "status", "created_at",
+    ),
+    "documents": ("id", "employee_id", "file_url", "file_name", "file_type", "category", "uploaded_at"),
+    "audit_logs": ("id", "user_id", "action", "resource", "target_id", "details", "created_at"),
+}
+JSONB_COLUMNS = {"allowances", "deductions", "details"}
+
+# MongoDB collection, and the index /api/status relies on, built after the load
+STATUS_CHECKS = "status_checks"
+STATUS_CHECK_INDEXES = ["timestamp"]
+
+COLLECTIONS = (*TABLES, STATUS_CHECKS)
+
+SYNTHETIC_EMAILS = f"%@{EMAIL_DOMAIN}"
+
+# init-db.js's trigger telling server.py's employee search index about each
+# changed employee. A load turns it off, since one notification per row
+# would only make the index rebuild over and over, and asks for a single
+# rebuild at the end instead
+SEARCH_TRIGGER = "employees_search_notify"
+SEARCH_CHANNEL = "employee_changes"
+SEARCH_REBUILD_PAYLOAD = "*"
+
+FIRST_NAMES = [
+    "Aarav", "Aisha", "Anil", "Ananya", "Arjun", "Deepa", "Eshwar", "Farah", "Fatima", "Hassan",
+    "Ishaan", "Kavya", "Kiran", "Lakshmi", "Meera", "Mohammed", "Nikhil", "Noor", "Omar", "Pooja",
+    "Priya", "Rahul", "Ravi", "Sana", "Sara", "Suresh", "Tariq", "Varun", "Yusuf", "Zainab",
+]
+LAST_NAMES = [
+    "Ahmed", "Al Mansoori", "Bhat", "Chopra", "Das", "Fernandes", "Gupta", "Hussain", "Iyer", "Joshi",
+    "Kapoor", "Khan", "Lalwani", "Menon", "Nair", "Pillai", "Potnuru", "Qureshi", "Rao", "Reddy",
+    "Shah", "Sharma", "Siddiqui", "Singh", "Verma",
+]
+DEPARTMENTS = ["Engineering", "Finance", "HR", "Operations", "Sales", "Marketing", "Legal", "Support"]
+
+# (value, weight) pairs
+ROLES = [("Employee", 94), ("HR", 3), ("Finance", 2), ("Admin", 1)]
+EMPLOYEE_STATUSES = [("Active", 92), ("Suspended", 3), ("Terminated", 5)]
+LEAVE_TYPES = [("Annual", 50), ("Sick", 30), ("Casual", 15), ("Unpaid", 5)]
+LEAVE_STATUSES = [("Approved", 80), ("Rejected", 8), ("Pending", 12)]
+SALARY_STATUSES = [("Paid", 95), ("On-hold", 2), ("Pending", 3)]
+DOCUMENT_TYPES = [
+    ("Passport", "application/pdf"), ("Visa", "application/pdf"), ("Emirates ID", "image/jpeg"),
+    ("Contract", "application/pdf"), ("Certificate", "application/pdf"), ("Photo", "image/png"),
+]
+
+ATTENDANCE_RATE = 0.95
+LEAVES_PER_YEAR = 6
+MAX_LEAVE_DAYS = 5
+AUDIT_EVENTS_PER_MONTH = 2
+
+# Employees are generated in teams of this many consecutive indexes; a
+# team's leaves are decided by its HR and Admin members. Load chunks are
+# whole teams, so the data does not depend on how the work is split
+TEAM_SIZE = 50
+APPROVER_ROLES = ("HR", "Admin")
+# Teams with fewer approvers get members promoted to HR, so nobody decides
+# their own leave
+MIN_APPROVERS = 2
+
+# "HH:MM:SS" for every minute of the day, so hot loops avoid formatting times
+MINUTES = [f"{m // 60:02d}:{m % 60:02d}:00" for m in range(24 * 60)]
+
+app = typer.Typer(add_completion=False)
+
+
+def _weighted(options):
+    values = [value for value, _ in options]
+    weights = [weight for _, weight in options]
+    return values, weights
+
+
+def _days_between(start: str, end: str) -> List[str]:
+    first = date.fromisoformat(start)
+    return [(first + timedelta(days=i)).isoformat() for i in range((date.fromisoformat(end) - first).days + 1)]
+
+
+def seeded_salt(seed: int, rounds: int = 10) -> bytes:
+    """bcrypt salt derived from the seed, so reruns produce identical password hashes.
+
+    Only for synthetic users, whose password is public anyway.
+    """
+    raw = random.Random(f"{seed}:password_salt").getrandbits(128).to_bytes(16, "big")
+    # bcrypt's base64 alphabet is "./A-Za-z0-9" instead of "A-Za-z0-9+/"
+    encoded = base64.b64encode(raw)[:22].translate(bytes.maketrans(
+        b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",
+        b"./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789",
+    ))
+    return b"$2b$%02d$%s" % (rounds, encoded)
+
+
+def parse_end_date(value: str, years: int) -> date:
+    try:
+        end_date = date.fromisoformat(value)
+    except ValueError:
+        raise typer.BadParameter(f"{value!r} is not a date in YYYY-MM-DD format", param_hint="'--end-date'")
+    if (end_date - date.min).days < 365 * years:
+        raise typer.BadParameter(f"{years} years of history ending {value} starts before year 1", param_hint="'--end-date'")
+    return end_date
+
+
+class DatasetGenerator:
+    """Deterministic row factory; yields ``(table, row)`` pairs.
+
+    Employee rows hold exactly the ``TABLES`` columns of their Postgres
+    table; status checks are MongoDB documents.
+
+    Every employee draws from its own RNG seeded by ``(seed, index)``, so any
+    run of whole teams (see TEAM_SIZE) can be generated independently and
+    the dataset does not depend on how the work is split across processes.
+    """
+
+    def __init__(
+        self,
+        years: int,
+        seed: int,
+        end_date: date,
+        password_hash: str,
+        status_checks_per_day: int = 24,
+    ):
+        self.years = years
+        self.seed = seed
+        self.rng = random.Random(seed)  # replaced per employee / per stream
+        self.end_date = end_date
+        self.start_date = end_date - timedelta(days=365 * years - 1)
+        self.password_hash = password_hash
+        self.status_checks_per_day = status_checks_per_day
+
+        days = [self.start_date + timedelta(days=i) for i in range((end_date - self.start_date).days + 1)]
+        self.days = [d.isoformat() for d in days]
+        # Friday/Saturday weekend, as in the UAE
+        self.working_days = [d.isoformat() for d in days if d.weekday() not in (4, 5)]
+        self.periods = sorted({d.isoformat()[:7] for d in days})
+
+    def _uuid(self) -> str:
+        h = "%032x" % self.rng.getrandbits(128)
+        return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{'89ab'[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}"
+
+    def _timestamp(self, day: str) -> str:
+        seconds = self.rng.randrange(86400)
+        return f"{day}T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+    def employee_rows(self, start: int, stop: int):
+        """Rows for employees ``start`` to ``stop``, team by team; a team cut by either end gets its own approvers."""
+        for team_start in range(start - start % TEAM_SIZE, stop, TEAM_SIZE):
+            yield from self._team_rows(max(team_start, start), min(team_start + TEAM_SIZE, stop))
+
+    def _team_rows(self, start: int, stop: int):
+        roles, role_weights = _weighted(ROLES)
+        statuses, status_weights = _weighted(EMPLOYEE_STATUSES)
+
+        # Every user row of the team comes first, so approvers are written
+        # before any leave that references them
+        members = []
+        for index in range(start, stop):
+            rng = self.rng = random.Random(f"{self.seed}:{index}")
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            code = f"SYN{index + 1:06d}"
+            email = f"{first}.{last}.{index + 1}@{EMAIL_DOMAIN}".lower().replace(" ", "")
+            user_id, employee_id = self._uuid(), self._uuid()
+            join_date = rng.choice(self.days[: max(len(self.days) // 2, 1)])
+            created_at = f"{join_date}T09:00:00"
+            user = {
+                "id": user_id,
+                "email": email,
+                "password_hash": self.password_hash,
+                "role": rng.choices(roles, role_weights)[0],
+                "created_at": created_at,
+            }
+            employee = {
+                "id": employee_id,
+                "user_id": user_id,
+                "full_name": f"{first} {last}",
+                "employee_id": code,
+                "department": rng.choice(DEPARTMENTS),
+                "phone": f"+9715{rng.randrange(10 ** 8):08d}",
+                "join_date": join_date,
+                "status": rng.choices(statuses, status_weights)[0],
+                "notes": None,
+                "created_at": created_at,
+            }
+            members.append((rng, user, employee))
+
+        approvers = [user for _, user, _ in members if user["role"] in APPROVER_ROLES]
+        for _, user, _ in members:
+            if len(approvers) >= MIN_APPROVERS:
+                break
+            if user["role"] not in APPROVER_ROLES:
+                user["role"] = "HR"
+                approvers.append(user)
+
+        for _, user, employee in members:
+            yield "users", user
+            yield "employees", employee
+        for rng, user, employee in members:
+            self.rng = rng
+            employee_id, join_date = employee["id"], employee["join_date"]
+            deciders = [approver["id"] for approver in approvers if approver is not user]
+            leaves = list(self._leaves(employee_id, join_date, deciders))
+            on_leave = {
+                day for leave in leaves if leave["status"] == "Approved"
+                for day in _days_between(leave["start_date"], leave["end_date"])
+            }
+            yield from self._attendance(employee_id, join_date, on_leave)
+            for leave in leaves:
+                yield "leaves", leave
+            yield from self._salary(employee_id, join_date)
+            yield from self._documents(employee_id, join_date)
+            yield from self._audit_logs(user["id"], employee_id, join_date)
+
+    def _attendance(self, employee_id: str, join_date: str, on_leave: Set[str]):
+        rng = self.rng
+        for day in self.working_days:
+            if day < join_date or day in on_leave or rng.random() > ATTENDANCE_RATE:
+                continue
+            check_in = f"{day}T{MINUTES[480 + int(rng.random() * 90)]}"
+            check_out = f"{day}T{MINUTES[960 + int(rng.random() * 120)]}"
+            yield "attendance", {
+                "id": self._uuid(),
+                "employee_id": employee_id,
+                "date": day,
+                "check_in": check_in,
+                "check_out": check_out,
+                "created_at": check_in,
+            }
+
+    def _leaves(self, employee_id: str, join_date: str, deciders: List[str]):
+        """Non-overlapping leave requests, decided (approved or rejected) by one of ``deciders``."""
+        rng = self.rng
+        types, type_weights = _weighted(LEAVE_TYPES)
+        statuses, status_weights = _weighted(LEAVE_STATUSES)
+        days = [day for day in self.working_days if day >= join_date]
+        count = rng.randint(LEAVES_PER_YEAR // 2, LEAVES_PER_YEAR * 3 // 2) * self.years
+        booked_until = ""
+        for start in sorted(rng.sample(days, min(count, len(days)))):
+            if start <= booked_until:
+                continue
+            end = booked_until = (date.fromisoformat(start) + timedelta(days=rng.randrange(MAX_LEAVE_DAYS))).isoformat()
+            status = rng.choices(statuses, status_weights)[0] if deciders else "Pending"
+            yield {
+                "id": self._uuid(),
+                "employee_id": employee_id,
+                "leave_type": rng.choices(types, type_weights)[0],
+                "start_date": start,
+                "end_date": end,
+                "reason": None,
+                "document_url": None,
+                "status": status,
+                "approved_by": None if status == "Pending" else rng.choice(deciders),
+                "comments": None,
+                "created_at": self._timestamp(start),
+            }
+
+    def _salary(self, employee_id: str, join_date: str):
+        rng = self.rng
+        statuses, status_weights = _weighted(SALARY_STATUSES)
+        basic = rng.randrange(4000, 40000, 250)
+        for period in self.periods:
+            if period < join_date[:7]:
+                continue
+            if period.endswith("-01"):
+                # Annual raise
+                basic = round(basic * rng.uniform(1.0, 1.08), -1)
+            allowances = {"housing": round(basic * 0.25, 2), "transport": 800.0}
+            deductions = {"absence": float(rng.choice((0, 0, 0, 150, 300)))}
+            yield "salary_payroll", {
+                "id": self._uuid(),
+                "employee_id": employee_id,
+                "basic": float(basic),
+                "allowances": allowances,
+                "deductions": deductions,
+                "net": round(basic + sum(allowances.values()) - sum(deductions.values()), 2),
+                "period": period,
+                "status": rng.choices(statuses, status_weights)[0],
+                "created_at": f"{period}-25T10:00:00",
+            }
+
+    def _documents(self, employee_id: str, join_date: str):
+        rng = self.rng
+        for category, file_type in rng.sample(DOCUMENT_TYPES, rng.randint(3, len(DOCUMENT_TYPES))):
+            extension = file_type.rsplit("/", 1)[-1]
+            file_name = f"{category.lower().replace(' ', '_')}.{extension}"
+            yield "documents", {
+                "id": self._uuid(),
+                "employee_id": employee_id,
+                "file_url": f"s3://dllc-hr-synthetic/{employee_id}/{file_name}",
+                "file_name": file_name,
+                "file_type": file_type,
+                "category": category,
+                "uploaded_at": self._timestamp(join_date),
+            }
+
+    def _audit_logs(self, user_id: str, employee_id: str, join_date: str):
+        rng = self.rng
+        actions = (("LOGIN", "auth"), ("UPDATE", "employee"), ("CREATE", "leave"), ("CHECK_IN", "attendance"))
+        for period in self.periods:
+            if period < join_date[:7]:
+                continue
+            for _ in range(AUDIT_EVENTS_PER_MONTH):
+                action, resource = rng.choice(actions)
+                yield "audit_logs", {
+                    "id": self._uuid(),
+                    "user_id": user_id,
+                    "action": action,
+                    "resource": resource,
+                    "target_id": employee_id,
+                    "details": None,
+                    "created_at": self._timestamp(f"{period}-{rng.randint(1, 28):02d}"),
+                }
+
+    def status_check_rows(self):
+        self.rng = random.Random(f"{self.seed}:status_checks")
+        n = self.status_checks_per_day
+        for day in self.days:
+            for i in range(n):
+                seconds = i * 86400 // n
+                yield "status_checks", {
+                    "id": self._uuid(),
+                    "client_name": f"synthetic-probe-{i % 4}",
+                    "timestamp": f"{day}T{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}+00:00",
+                    "synthetic": True,
+                }
+
+
+class BulkLoader:
+    """Buffers rows per table and writes them with COPY, one transaction per batch.
+
+    The COPYs run on a single writer thread, in ``TABLES`` order so parents
+    land before their children; psycopg releases the GIL while it waits on
+    the server, so the next batch is generated in the meantime.
+    """
+
+    def __init__(self, conn: psycopg.Connection, batch_size: int):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.buffers: Dict[str, List[dict]] = {name: [] for name in TABLES}
+        self.buffered = 0
+        self.counts: Dict[str, int] = {name: 0 for name in TABLES}
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending = deque()
+        self.max_pending = 2
+
+    def add(self, table: str, row: dict):
+        self.buffers[table].append(row)
+        self.buffered += 1
+        if self.buffered >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffered:
+            return
+        batch = {table: rows for table, rows in self.buffers.items() if rows}
+        self.buffers = {name: [] for name in TABLES}
+        self.buffered = 0
+        for table, rows in batch.items():
+            self.counts[table] += len(rows)
+        while len(self.pending) >= self.max_pending:
+            self.pending.popleft().result()
+        self.pending.append(self.executor.submit(self._copy, batch))
+
+    def _copy(self, batch: Dict[str, List[dict]]):
+        with self.conn.transaction(), self.conn.cursor() as cursor:
+            for table, rows in batch.items():
+                columns = TABLES[table]
+                json_columns = [i for i, column in enumerate(columns) if column in JSONB_COLUMNS]
+                with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                    for row in rows:
+                        values = [row[column] for column in columns]
+                        for i in json_columns:
+                            if values[i] is not None:
+                                values[i] = Jsonb(values[i])
+                        copy.write_row(values)
+
+    def close(self):
+        self._flush()
+        while self.pending:
+            self.pending.popleft().result()
+        self.executor.shutdown()
+
+    def abort(self):
+        """Stop without flushing; used when generation already failed."""
+        self.executor.shutdown(cancel_futures=True)
+        self.pending.clear()
+
+
+def _load_chunk(task):
+    """Pool worker: generate one slice of employees and COPY it into Postgres."""
+    (start, stop), settings = task
+    with psycopg.connect(settings["database_url"]) as conn:
+        generator = DatasetGenerator(
+            settings["years"], settings["seed"], settings["end_date"], settings["password_hash"],
+        )
+        loader = BulkLoader(conn, settings["batch_size"])
+        try:
+            for table, row in generator.employee_rows(start, stop):
+                loader.add(table, row)
+        except BaseException:
+            # Flushing here could raise too and hide the original error
+            loader.abort()
+            raise
+        loader.close()
+    return loader.counts
+
+
+def _load_status_checks(settings) -> Dict[str, int]:
+    """Pool worker: insert the status checks into MongoDB with unordered insert_many batches."""
+    generator = DatasetGenerator(
+        settings["years"], settings["seed"], settings["end_date"], settings["password_hash"],
+        status_checks_per_day=settings["status_checks_per_day"],
+    )
+    client = MongoClient(settings["mongo_url"])
+    try:
+        collection = client[settings["db_name"]][STATUS_CHECKS]
+        count = 0
+        batch = []
+        for _, doc in generator.status_check_rows():
+            batch.append(doc)
+            if len(batch) >= settings["batch_size"]:
+                collection.insert_many(batch, ordered=False, bypass_document_validation=True)
+                count += len(batch)
+                batch = []
+        if batch:
+            collection.insert_many(batch, ordered=False, bypass_document_validation=True)
+            count += len(batch)
+    finally:
+        client.close()
+    return {STATUS_CHECKS: count}
+
+
+def _load_task(task):
+    if task[0] == STATUS_CHECKS:
+        return _load_status_checks(task[1])
+    return _load_chunk(task)
+
+
+def _synthetic_rows_present(conn) -> bool:
+    return conn.execute("SELECT 1 FROM users WHERE email LIKE %s LIMIT 1", (SYNTHETIC_EMAILS,)).fetchone() is not None
+
+
+def _delete_synthetic_rows(conn):
+    synthetic_users = "SELECT id FROM users WHERE email LIKE %s"
+    with conn.transaction():
+        # audit_logs only nulls its user_id when a user goes
+        deleted = conn.execute(f"DELETE FROM audit_logs WHERE user_id IN ({synthetic_users})", (SYNTHETIC_EMAILS,)).rowcount
+        typer.echo(f"Removed {deleted} synthetic rows from audit_logs")
+        # Employees first: their leaves cascade away with them, and still
+        # reference the users through leaves.approved_by
+        deleted = conn.execute(f"DELETE FROM employees WHERE user_id IN ({synthetic_users})", (SYNTHETIC_EMAILS,)).rowcount
+        typer.echo(f"Removed {deleted} synthetic employees with their attendance, leaves, salaries and documents")
+        deleted = conn.execute("DELETE FROM users WHERE email LIKE %s", (SYNTHETIC_EMAILS,)).rowcount
+        typer.echo(f"Removed {deleted} synthetic users")
+
+
+def _search_trigger_enabled(conn) -> bool:
+    row = conn.execute(
+        "SELECT tgenabled <> 'D' FROM pg_trigger WHERE tgname = %s AND tgrelid = 'employees'::regclass",
+        (SEARCH_TRIGGER,),
+    ).fetchone()
+    return bool(row and row[0])
+
+
+def _drop_secondary_indexes(conn) -> List[str]:
+    """Drop the non-unique indexes and foreign keys of the loaded tables; the statements restoring them.
+
+    Primary keys and unique indexes stay, so duplicates are still refused
+    during the load.
+    """
+    tables = list(TABLES)
+    restore = []
+    with conn.transaction():
+        indexes = conn.execute(
+            "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid) FROM pg_index"
+            " WHERE indrelid = ANY(%s::regclass[]) AND NOT indisunique",
+            (tables,),
+        ).fetchall()
+        for name, definition in indexes:
+            conn.execute(f"DROP INDEX {name}")
+            restore.append(definition)
+        foreign_keys = conn.execute(
+            "SELECT conrelid::regclass::text, quote_ident(conname), pg_get_constraintdef(oid) FROM pg_constraint"
+            " WHERE contype = 'f' AND conrelid = ANY(%s::regclass[])",
+            (tables,),
+        ).fetchall()
+        for table, name, definition in foreign_keys:
+            conn.execute(f"ALTER TABLE {table} DROP CONSTRAINT {name}")
+            restore.append(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+    typer.echo(f"--fast: dropped {len(indexes)} indexes and {len(foreign_keys)} foreign keys for the load")
+    return restore
+
+
+@app.command()
+def generate(
+    employees: int = typer.Option(10000, min=1, help="Number of employees to create"),
+    years: int = typer.Option(1, min=1, help="Years of history ending at --end-date"),
+    seed: int = typer.Option(42, help="Random seed; same inputs produce the same dataset"),
+    end_date: str = typer.Option(DEFAULT_END_DATE, help="Last day of generated history (YYYY-MM-DD)"),
+    status_checks_per_day: int = typer.Option(24, min=0, max=86400, help="Status checks per day"),
+    batch_size: int = typer.Option(50000, min=1, help="Rows per COPY transaction (or insert_many call)"),
+    processes: int = typer.Option(os.cpu_count() or 1, min=1, help="Generator processes"),
+    reset: bool = typer.Option(False, help="Delete previously generated synthetic data first"),
+    fast: bool = typer.Option(
+        False, help="Drop non-unique indexes and foreign keys of the loaded tables during the load and "
+                    "rebuild them after; the app's queries are slow meanwhile",
+    ),
+    database_url: Optional[str] = typer.Option(None, envvar="DATABASE_URL", help="PostgreSQL URL of the Node API"),
+    mongo_url: Optional[str] = typer.Option(None, envvar="MONGO_URL", help="MongoDB for status checks"),
+    db_name: Optional[str] = typer.Option(None, envvar="DB_NAME"),
+):
+    """Generate a synthetic HR dataset and bulk load it into PostgreSQL (and MongoDB)."""
+    if not database_url:
+        raise typer.BadParameter("DATABASE_URL must be set (env, .env or option)")
+    end = parse_end_date(end_date, years)
+    with_status_checks = bool(status_checks_per_day)
+    if with_status_checks and not (mongo_url and db_name):
+        typer.echo("MONGO_URL and DB_NAME not set; skipping status checks", err=True)
+        with_status_checks = False
+
+    conn = psycopg.connect(database_url, autocommit=True)
+    client = MongoClient(mongo_url) if with_status_checks else None
+    search_trigger = False
+    try:
+        status_checks = client[db_name][STATUS_CHECKS] if client else None
+        if not reset:
+            loaded = ["users"] if _synthetic_rows_present(conn) else []
+            if status_checks is not None and status_checks.find_one({"synthetic": True}, {"_id": 1}):
+                loaded.append(STATUS_CHECKS)
+            if loaded:
+                typer.echo(
+                    f"Synthetic data already present in {', '.join(loaded)}; rerun with --reset to replace it",
+                    err=True,
+                )
+                raise typer.Exit(1)
+
+        search_trigger = _search_trigger_enabled(conn)
+        if search_trigger:
+            conn.execute(f"ALTER TABLE employees DISABLE TRIGGER {SEARCH_TRIGGER}")
+        if reset:
+            _delete_synthetic_rows(conn)
+            if status_checks is not None:
+                deleted = status_checks.delete_many({"synthetic": True}).deleted_count
+                typer.echo(f"Removed {deleted} synthetic documents from {STATUS_CHECKS}")
+
+        settings = {
+            "database_url": database_url,
+            "mongo_url": mongo_url,
+            "db_name": db_name,
+            "years": years,
+            "seed": seed,
+            "end_date": end,
+            # One bcrypt hash shared by everyone: hashing per user would dominate the run
+            "password_hash": bcrypt.hashpw(DEFAULT_PASSWORD.encode(), seeded_salt(seed)).decode(),
+            "status_checks_per_day": status_checks_per_day,
+            "batch_size": batch_size,
+        }
+
+        # Several chunks per process so a slow chunk doesn't leave the others
+        # idle; each one whole teams
+        chunk = math.ceil(employees / (processes * 4) / TEAM_SIZE) * TEAM_SIZE
+        tasks = [((start, min(start + chunk, employees)), settings) for start in range(0, employees, chunk)]
+        if with_status_checks:
+            tasks.append((STATUS_CHECKS, settings))
+
+        started = time.perf_counter()
+        restore = _drop_secondary_indexes(conn) if fast else []
+        counts = Counter()
+        try:
+            with Pool(processes) as pool:
+                for task_counts in pool.imap_unordered(_load_task, tasks):
+                    counts.update(task_counts)
+            loaded_at = time.perf_counter()
+        finally:
+            for statement in restore:
+                conn.execute(statement)
+        elapsed = time.perf_counter() - started
+
+        total = sum(counts.values())
+        for collection in COLLECTIONS:
+            typer.echo(f"{collection:>15}: {counts[collection]:>12,}")
+        if restore:
+            typer.echo(f"Inserted {total:,} rows in {loaded_at - started:.1f}s, then rebuilt indexes and foreign keys in "
+                       f"{elapsed - (loaded_at - started):.1f}s")
+        typer.echo(f"Loaded {total:,} rows in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)")
+
+        if status_checks is not None:
+            for field in STATUS_CHECK_INDEXES:
+                status_checks.create_index([(field, ASCENDING)])
+        # Fresh statistics so the planner sees the new table sizes right away
+        conn.execute(f"ANALYZE {', '.join(TABLES)}")
+    finally:
+        if search_trigger:
+            conn.execute(f"ALTER TABLE employees ENABLE TRIGGER {SEARCH_TRIGGER}")
+            conn.execute("SELECT pg_notify(%s, %s)", (SEARCH_CHANNEL, SEARCH_REBUILD_PAYLOAD))
+        conn.close()
+        if client is not None:
+            client.close()
+
+
+if __name__ == "__main__":
+    app()
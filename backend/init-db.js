@@ -136,6 +136,37 @@ CREATE INDEX IF NOT EXISTS idx_tickets_employee_id ON tickets(employee_id);
 CREATE INDEX IF NOT EXISTS idx_audit_logs_user_id ON audit_logs(user_id);
 CREATE INDEX IF NOT EXISTS idx_company_settings_category ON company_settings(category);
 
+-- Word prefix search over employees, used while the Python service's
+-- in-memory employee index is still building
+CREATE INDEX IF NOT EXISTS idx_employees_search ON employees
+  USING GIN (to_tsvector('simple', full_name || ' ' || employee_id || ' ' || coalesce(department, '')));
+CREATE INDEX IF NOT EXISTS idx_users_email_search ON users USING GIN (to_tsvector('simple', email));
+
+-- Tell the Python service's employee search index which employees changed
+CREATE OR REPLACE FUNCTION notify_employee_change() RETURNS trigger AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'users' THEN
+    PERFORM pg_notify('employee_changes', id::text) FROM employees WHERE user_id = NEW.id;
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM pg_notify('employee_changes', OLD.id::text);
+  ELSE
+    PERFORM pg_notify('employee_changes', NEW.id::text);
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS employees_search_notify ON employees;
+CREATE TRIGGER employees_search_notify
+  AFTER INSERT OR UPDATE OR DELETE ON employees
+  FOR EACH ROW EXECUTE FUNCTION notify_employee_change();
+
+DROP TRIGGER IF EXISTS users_search_notify ON users;
+CREATE TRIGGER users_search_notify
+  AFTER UPDATE OF email ON users
+  FOR EACH ROW WHEN (OLD.email IS DISTINCT FROM NEW.email)
+  EXECUTE FUNCTION notify_employee_change();
+
 -- Ensure file URL columns support large data URLs when S3 is not configured
 ALTER TABLE documents ALTER COLUMN file_url TYPE TEXT;
 ALTER TABLE leaves ALTER COLUMN document_url TYPE TEXT;
@@ -0,0 +1,317 @@
+import cProfile
+import heapq
+import hmac
+import io
+import itertools
+import marshal
+import pstats
+import random
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+# Set to "busy" on a requested profile that could not run because another
+# request was being profiled
+PROFILE_STATUS_HEADER = "X-Profile-Status"
+
+# Paths of call-graph branches below this share of the request are dropped
+# from the speedscope export to keep diamond-shaped graphs from exploding
+MIN_BRANCH_FRACTION = 0.001
+MAX_STACK_DEPTH = 256
+
+
+class RequestProfile:
+    """One profiled request: cProfile stats plus a wall/CPU split."""
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        status_code: int,
+        wall_s: float,
+        cpu_s: float,
+        stats: dict,
+        requested: bool = False,
+    ):
+        self.id = str(uuid.uuid4())
+        self.method = method
+        self.path = path
+        self.status_code = status_code
+        self.wall_s = wall_s
+        self.cpu_s = cpu_s
+        self.stats = stats
+        # Asked for with the admin token rather than picked by sampling
+        self.requested = requested
+        self.timestamp = datetime.now(timezone.utc)
+        self.recorded_at = time.monotonic()
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "requested": self.requested,
+            "timestamp": self.timestamp.isoformat(),
+            "wall_ms": round(self.wall_s * 1000, 3),
+            # CPU burnt on the event loop thread (handlers, pydantic, JSON
+            # encoding); the rest of the wall time was spent awaiting, which
+            # for this service is almost entirely database round trips
+            "cpu_ms": round(self.cpu_s * 1000, 3),
+            "await_ms": round(max(self.wall_s - self.cpu_s, 0.0) * 1000, 3),
+        }
+
+    def to_pstats(self) -> bytes:
+        """Serialise in the format written by ``pstats.Stats.dump_stats``."""
+        return marshal.dumps(self.stats)
+
+    def top_functions(self, limit: int = 20) -> str:
+        stats = pstats.Stats(_StatsSource(self.stats), stream=io.StringIO())
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stats.stream.getvalue()
+
+    def to_speedscope(self) -> dict:
+        """Unfold the cProfile call graph into weighted stacks for speedscope.
+
+        cProfile only records caller/callee totals, so time for a function
+        reached from several callers is split in proportion to each caller's
+        share of its cumulative time.
+        """
+        frames: List[dict] = []
+        frame_index: Dict[tuple, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+
+        callees: Dict[tuple, List[tuple]] = {}
+        for func, (_, _, _, _, callers) in self.stats.items():
+            for caller, (_, _, _, caller_ct) in callers.items():
+                callees.setdefault(caller, []).append((func, caller_ct))
+
+        def frame_of(func: tuple) -> int:
+            if func not in frame_index:
+                filename, line, name = func
+                frame_index[func] = len(frames)
+                frames.append({"name": name, "file": filename, "line": line})
+            return frame_index[func]
+
+        roots = [
+            func for func, (_, _, _, _, callers) in self.stats.items()
+            if not any(caller in self.stats for caller in callers)
+        ]
+        total = sum(self.stats[func][3] for func in roots) or 1e-9
+        min_budget = total * MIN_BRANCH_FRACTION
+
+        def walk(func: tuple, stack: List[int], on_stack: set, budget: float):
+            _, _, tt, ct, _ = self.stats[func]
+            scale = min(budget / ct, 1.0) if ct else 0.0
+            stack = stack + [frame_of(func)]
+            if tt * scale > 0:
+                samples.append(stack)
+                weights.append(tt * scale)
+            if len(stack) >= MAX_STACK_DEPTH:
+                return
+            on_stack.add(func)
+            for callee, callee_ct in callees.get(func, ()):
+                child_budget = callee_ct * scale
+                if callee not in on_stack and child_budget >= min_budget:
+                    walk(callee, stack, on_stack, child_budget)
+            on_stack.discard(func)
+
+        for root in roots:
+            walk(root, [], set(), self.stats[root][3])
+
+        name = f"{self.method} {self.path}"
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "dllc-hr-profiler",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class _StatsSource:
+    """Minimal stand-in accepted by ``pstats.Stats`` for an already-built stats dict."""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def token_matches(expected: Optional[str], supplied: Optional[str]) -> bool:
+    """Constant-time check of a supplied admin token; False when none is configured."""
+    if not expected or supplied is None:
+        return False
+    return hmac.compare_digest(expected.encode(), supplied.encode())
+
+
+class ProfileStore:
+    """Bounded buffers of request profiles.
+
+    Profiles requested with the admin token go into a ring of the ``size``
+    most recent ones, so the profile you just asked for is always there.
+    Sampled profiles are kept separately: the ``size`` slowest seen in the
+    last ``max_age_s`` seconds, in a min-heap on wall time. Ageing them out
+    lets the buffer follow what is slow now instead of holding on to
+    startup outliers forever.
+    """
+
+    def __init__(self, size: int, max_age_s: float = 3600.0):
+        self.size = size
+        self.max_age_s = max_age_s
+        self._requested: deque = deque(maxlen=size)
+        self._sampled: List[Tuple[float, int, RequestProfile]] = []
+        self._counter = itertools.count()
+
+    def __len__(self):
+        self._expire()
+        return len(self._requested) + len(self._sampled)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.max_age_s
+        kept = [entry for entry in self._sampled if entry[2].recorded_at >= cutoff]
+        if len(kept) < len(self._sampled):
+            heapq.heapify(kept)
+            self._sampled = kept
+
+    def add(self, profile: RequestProfile) -> bool:
+        """Store ``profile``; False when a sampled one is too fast to keep."""
+        if not self.size:
+            return False
+        if profile.requested:
+            self._requested.append(profile)
+            return True
+
+        self._expire()
+        entry = (profile.wall_s, next(self._counter), profile)
+        if len(self._sampled) < self.size:
+            heapq.heappush(self._sampled, entry)
+        elif entry[0] > self._sampled[0][0]:
+            heapq.heapreplace(self._sampled, entry)
+        else:
+            return False
+        return True
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        self._expire()
+        for profile in self._profiles():
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def list(self) -> List[dict]:
+        """Summaries of every kept profile, slowest first."""
+        self._expire()
+        return [profile.summary() for profile in sorted(self._profiles(), key=lambda p: p.wall_s, reverse=True)]
+
+    def _profiles(self) -> List[RequestProfile]:
+        return [*self._requested, *(profile for _, _, profile in self._sampled)]
+
+
+class ProfilingMiddleware:
+    """Opt-in cProfile capture of individual requests.
+
+    A request is profiled when it carries ``X-Profile: <admin token>`` or is
+    picked by sampling ``sample_rate`` of traffic. cProfile hooks the whole
+    event loop thread, so only one request is profiled at a time and work
+    from concurrent requests interleaved with it shows up in its profile. A
+    requested profile that finds the profiler busy gets
+    ``X-Profile-Status: busy`` instead of an ``X-Profile-Id``.
+
+    Plain ASGI rather than ``BaseHTTPMiddleware``, so requests that are not
+    profiled only pay for the header check. The profile ends when the
+    response headers are sent; the body of a streaming response is not in it.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        admin_token: Optional[str] = None,
+        sample_rate: float = 0.0,
+        exclude_prefix: Optional[str] = None,
+    ):
+        self.app = app
+        self.store = store
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.exclude_prefix = exclude_prefix
+        self._active = False
+
+    def _wants_profile(self, scope: Scope) -> Optional[bool]:
+        """None to skip the request, else whether it was explicitly requested."""
+        if scope["type"] != "http":
+            return None
+        if self.exclude_prefix and scope["path"].startswith(self.exclude_prefix):
+            return None
+        if token_matches(self.admin_token, Headers(scope=scope).get(PROFILE_HEADER)):
+            return True
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return False
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        requested = self._wants_profile(scope)
+        if requested is None or (self._active and not requested):
+            await self.app(scope, receive, send)
+            return
+        if self._active:
+            await self.app(scope, receive, _with_header(send, PROFILE_STATUS_HEADER, "busy"))
+            return
+
+        self._active = running = True
+        profiler = cProfile.Profile()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        profiler.enable()
+
+        def stop():
+            nonlocal running
+            profiler.disable()
+            self._active = running = False
+            return time.perf_counter() - wall_start, time.thread_time() - cpu_start
+
+        async def send_profiled(message: Message):
+            if message["type"] == "http.response.start" and running:
+                wall_s, cpu_s = stop()
+                profiler.create_stats()
+                profile = RequestProfile(
+                    scope["method"], scope["path"], message["status"], wall_s, cpu_s, profiler.stats, requested
+                )
+                if self.store.add(profile):
+                    MutableHeaders(scope=message).append(PROFILE_ID_HEADER, profile.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            # The app failed before sending a response
+            if running:
+                stop()
+
+
+def _with_header(send: Send, name: str, value: str) -> Send:
+    async def send_with_header(message: Message):
+        if message["type"] == "http.response.start":
+            MutableHeaders(scope=message).append(name, value)
+        await send(message)
+
+    return send_with_header
@@ -1,15 +1,26 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+import psycopg
+from psycopg.rows import dict_row, tuple_row
+from psycopg_pool import AsyncConnectionPool
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List
+from typing import List, Optional
+import asyncio
+import gc
+import json
+import time
 import uuid
 from datetime import datetime, timezone
 
+from employee_search import EmployeeSearchIndex, tokenize
+from profiling import ProfileStore, ProfilingMiddleware, token_matches
+
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -19,6 +30,54 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# PostgreSQL, shared with the Node service, which owns the employee records
+database_url = os.environ.get('DATABASE_URL')
+pg_pool: Optional[AsyncConnectionPool] = None
+
+# In-memory typeahead index over the Postgres employees table. A background
+# task builds it and keeps it current from the employee_changes
+# notifications sent by the trigger in init-db.js. Without the trigger it
+# checks every EMPLOYEE_INDEX_REFRESH_SECONDS whether the table changed and
+# re-indexes the employees that did
+employee_index = EmployeeSearchIndex()
+employee_index_task: Optional[asyncio.Task] = None
+EMPLOYEE_INDEX_REFRESH_SECONDS = float(os.environ.get('EMPLOYEE_INDEX_REFRESH_SECONDS', '60'))
+EMPLOYEE_INDEX_RETRY_SECONDS = 10
+EMPLOYEE_CHANNEL = "employee_changes"
+EMPLOYEE_TRIGGER = "employees_search_notify"
+# Sent on EMPLOYEE_CHANNEL instead of an id to ask for a full rebuild, e.g.
+# by generate_dataset.py after a load with the trigger disabled
+EMPLOYEE_REBUILD_PAYLOAD = "*"
+# Notifications arriving this close together are applied as one batch
+EMPLOYEE_CHANGE_BATCH_SECONDS = 0.05
+# Changed employees are re-indexed one at a time, yielding to the event loop
+# whenever EMPLOYEE_CHANGE_SLICE_SECONDS have passed so searches keep being
+# served. That costs over ten times an employee's share of a rebuild (about
+# 1 ms vs 70 us at 100k employees) but, unlike a rebuild, barely slows
+# searches down. So only a batch touching more than
+# EMPLOYEE_CHANGE_REBUILD_SHARE of the index (and at least
+# EMPLOYEE_CHANGE_REBUILD_MIN employees) is rebuilt instead, once the burst
+# of notifications is over or EMPLOYEE_CHANGE_SETTLE_SECONDS have passed
+EMPLOYEE_CHANGE_SLICE_SECONDS = 0.005
+EMPLOYEE_CHANGE_REBUILD_MIN = 100
+EMPLOYEE_CHANGE_REBUILD_SHARE = 0.1
+EMPLOYEE_CHANGE_SETTLE_SECONDS = 10
+# Rows per round trip when reading employees through a server-side cursor;
+# each batch is parsed on the event loop, between searches
+EMPLOYEE_FETCH_BATCH = 2000
+
+# Opt-in request profiling: send X-Profile: <PROFILER_TOKEN>, or sample a
+# fraction of traffic with PROFILE_SAMPLE_RATE (0 disables sampling). The
+# PROFILE_BUFFER_SIZE most recent requested profiles are kept, plus the
+# PROFILE_BUFFER_SIZE slowest sampled ones of the last PROFILE_MAX_AGE_SECONDS.
+# With neither set the middleware is not installed at all
+profiler_token = os.environ.get('PROFILER_TOKEN')
+profile_sample_rate = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+profile_store = ProfileStore(
+    int(os.environ.get('PROFILE_BUFFER_SIZE', '20')),
+    max_age_s=float(os.environ.get('PROFILE_MAX_AGE_SECONDS', '3600')),
+)
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -37,6 +96,35 @@ class StatusCheck(BaseModel):
 class StatusCheckCreate(BaseModel):
     client_name: str
 
+class EmployeeSearchHit(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    id: str
+    full_name: Optional[str] = None
+    employee_id: Optional[str] = None
+    email: Optional[str] = None
+    department: Optional[str] = None
+    status: Optional[str] = None
+    score: float = 0.0
+
+EMPLOYEES_SQL = """
+    SELECT e.id::text AS id, e.full_name, e.employee_id, u.email, e.department, e.status
+    FROM employees e LEFT JOIN users u ON u.id = e.user_id
+"""
+
+# A hash of each employee's id and indexed fields. Polling compares their total
+# with the one it holds, and only on a mismatch reads them all to find the
+# employees that changed
+EMPLOYEE_HASH_SQL = "hashtext(ROW(e.id, e.full_name, e.employee_id, u.email, e.department, e.status)::text)"
+EMPLOYEE_HASHES_SQL = f"""
+    SELECT e.id::text, {EMPLOYEE_HASH_SQL}
+    FROM employees e LEFT JOIN users u ON u.id = e.user_id
+"""
+EMPLOYEES_FINGERPRINT_SQL = f"""
+    SELECT count(*), coalesce(sum({EMPLOYEE_HASH_SQL}), 0)
+    FROM employees e LEFT JOIN users u ON u.id = e.user_id
+"""
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
@@ -66,6 +154,223 @@ async def get_status_checks():
     
     return status_checks
 
+@api_router.get("/employees/search", response_model=List[EmployeeSearchHit])
+async def search_employees(
+    q: str = Query(..., min_length=1),
+    status: Optional[str] = None,
+    department: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+):
+    if employee_index.ready:
+        return employee_index.search(q, limit=limit, status=status, department=department)
+    if pg_pool is None:
+        raise HTTPException(status_code=503, detail="Employee search is not configured")
+
+    # Index still building: prefix match the terms in Postgres instead, using
+    # the text indexes from init-db.js. All terms must match the name, code
+    # and department, or all must match the email; results are in name order
+    terms = tokenize(q)
+    if not terms:
+        return []
+    sql = f"""
+        {EMPLOYEES_SQL}
+        WHERE e.id IN (
+            SELECT id FROM employees
+            WHERE to_tsvector('simple', full_name || ' ' || employee_id || ' ' || coalesce(department, ''))
+                  @@ to_tsquery('simple', %(query)s)
+            UNION
+            SELECT employees.id FROM users JOIN employees ON employees.user_id = users.id
+            WHERE to_tsvector('simple', users.email) @@ to_tsquery('simple', %(query)s)
+        )
+          AND (%(status)s::text IS NULL OR e.status = %(status)s)
+          AND (%(department)s::text IS NULL OR e.department = %(department)s)
+        ORDER BY e.full_name, e.id
+        LIMIT %(limit)s
+    """
+    # tokenize() only yields [a-z0-9] runs, which are safe tsquery lexemes
+    params = {
+        "query": " & ".join(f"{term}:*" for term in terms),
+        "status": status,
+        "department": department,
+        "limit": limit,
+    }
+    try:
+        async with pg_pool.connection(timeout=5) as conn, conn.cursor(row_factory=dict_row) as cursor:
+            await cursor.execute(sql, params)
+            return await cursor.fetchall()
+    except psycopg.Error:
+        logger.exception("Employee search fallback failed")
+        raise HTTPException(status_code=503, detail="Employee search is temporarily unavailable")
+
+async def fetch_batches(conn, sql: str, params=None, row_factory=dict_row):
+    """Rows of ``sql`` in batches, read through a server-side cursor."""
+    async with conn.transaction(), conn.cursor(name="employee_index", row_factory=row_factory) as cursor:
+        await cursor.execute(sql, params)
+        while batch := await cursor.fetchmany(EMPLOYEE_FETCH_BATCH):
+            yield batch
+
+async def fetch_employees(conn, ids: Optional[List[str]] = None) -> List[dict]:
+    sql, params = EMPLOYEES_SQL, None
+    if ids is not None:
+        sql, params = f"{EMPLOYEES_SQL} WHERE e.id = ANY(%s::uuid[])", (ids,)
+    return [employee async for batch in fetch_batches(conn, sql, params) for employee in batch]
+
+async def update_employee_hashes(conn, hashes: dict) -> set:
+    """Bring ``hashes`` up to date; the ids of employees added, changed or removed."""
+    changed, seen = set(), set()
+    async for batch in fetch_batches(conn, EMPLOYEE_HASHES_SQL, row_factory=tuple_row):
+        for employee_id, row_hash in batch:
+            seen.add(employee_id)
+            if hashes.get(employee_id) != row_hash:
+                hashes[employee_id] = row_hash
+                changed.add(employee_id)
+    if len(hashes) == len(seen):
+        return changed
+    # Some employees were deleted; find them a batch at a time
+    ids = list(hashes)
+    for start in range(0, len(ids), EMPLOYEE_FETCH_BATCH):
+        for employee_id in ids[start:start + EMPLOYEE_FETCH_BATCH]:
+            if employee_id not in seen:
+                del hashes[employee_id]
+                changed.add(employee_id)
+        await asyncio.sleep(0)
+    return changed
+
+async def load_employee_index(conn) -> EmployeeSearchIndex:
+    """Build a fresh index from the employees table off the event loop.
+
+    The build competes with searches for the GIL for about 7 s at 100k
+    employees, so it only runs at startup and after bulk changes. The
+    index's millions of containers have no reference cycles; leaving them
+    to the cyclic GC would make every full collection, during the build and
+    after it, stop the event loop for up to a second. So the GC is paused
+    for the build and everything alive afterwards is frozen out of it
+    (frozen objects are still freed by reference counting).
+    """
+    employees = await fetch_employees(conn)
+    index = EmployeeSearchIndex()
+    gc.disable()
+    try:
+        await asyncio.to_thread(index.build, employees)
+    finally:
+        gc.enable()
+    del employees
+    gc.freeze()
+    logger.info("Employee search index built with %d employees", len(index))
+    return index
+
+def employee_change_rebuild_count() -> int:
+    return max(EMPLOYEE_CHANGE_REBUILD_MIN, int(len(employee_index) * EMPLOYEE_CHANGE_REBUILD_SHARE))
+
+async def apply_employee_changes(conn, employee_ids: set):
+    """Re-read the given employees and update the index, or rebuild it for a large batch."""
+    global employee_index
+    if EMPLOYEE_REBUILD_PAYLOAD in employee_ids or len(employee_ids) >= employee_change_rebuild_count():
+        employee_index = await load_employee_index(conn)
+        return
+    found = await fetch_employees(conn, sorted(employee_ids))
+    removed = employee_ids - {employee["id"] for employee in found}
+    slice_start = time.perf_counter()
+    for employee in found:
+        employee_index.upsert(employee)
+        if time.perf_counter() - slice_start >= EMPLOYEE_CHANGE_SLICE_SECONDS:
+            await asyncio.sleep(0)
+            slice_start = time.perf_counter()
+    for employee_id in removed:
+        employee_index.remove(employee_id)
+
+async def wait_for_quiet(conn):
+    """Skip notifications until a batch interval passes without any; a rebuild covers them."""
+    deadline = asyncio.get_running_loop().time() + EMPLOYEE_CHANGE_SETTLE_SECONDS
+    while asyncio.get_running_loop().time() < deadline:
+        if not [notify async for notify in conn.notifies(timeout=EMPLOYEE_CHANGE_BATCH_SECONDS)]:
+            return
+
+async def listen_employee_changes(conn):
+    global employee_index
+    await conn.execute(f"LISTEN {EMPLOYEE_CHANNEL}")
+    # Listen before reading the snapshot so no change is missed; a change
+    # replayed on top of the snapshot is harmless
+    employee_index = await load_employee_index(conn)
+    while True:
+        # Wait for a change, then collect whatever follows it closely
+        changed = set()
+        async for notify in conn.notifies(stop_after=1):
+            changed.add(notify.payload)
+        rebuild_count = employee_change_rebuild_count()
+        async for notify in conn.notifies(timeout=EMPLOYEE_CHANGE_BATCH_SECONDS, stop_after=rebuild_count):
+            changed.add(notify.payload)
+        if EMPLOYEE_REBUILD_PAYLOAD in changed or len(changed) >= rebuild_count:
+            # A bulk change: rebuild once it is over, not once per batch
+            await wait_for_quiet(conn)
+        await apply_employee_changes(conn, changed)
+
+async def poll_employee_index(conn):
+    global employee_index
+    # Hashes are read before the snapshot: anything changed in between is
+    # seen as changed on the next check and harmlessly re-read
+    hashes = {}
+    await update_employee_hashes(conn, hashes)
+    employee_index = await load_employee_index(conn)
+    while True:
+        await asyncio.sleep(EMPLOYEE_INDEX_REFRESH_SECONDS)
+        cursor = await conn.execute(EMPLOYEES_FINGERPRINT_SQL)
+        if await cursor.fetchone() != (len(hashes), sum(hashes.values())):
+            await apply_employee_changes(conn, await update_employee_hashes(conn, hashes))
+
+async def sync_employee_index():
+    """Build the employee index and keep it current until cancelled."""
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(database_url, autocommit=True) as conn:
+                cursor = await conn.execute(
+                    "SELECT 1 FROM pg_trigger WHERE tgname = %s AND tgrelid = 'employees'::regclass",
+                    (EMPLOYEE_TRIGGER,),
+                )
+                if await cursor.fetchone():
+                    await listen_employee_changes(conn)
+                else:
+                    logger.warning(
+                        "Trigger %s missing (run init-db.js); checking employees for changes every %ss",
+                        EMPLOYEE_TRIGGER, EMPLOYEE_INDEX_REFRESH_SECONDS,
+                    )
+                    await poll_employee_index(conn)
+        except Exception:
+            logger.exception("Employee index sync failed")
+        await asyncio.sleep(EMPLOYEE_INDEX_RETRY_SECONDS)
+
+def require_profiler_token(token: Optional[str]):
+    if not token_matches(profiler_token, token):
+        raise HTTPException(status_code=403, detail="Profiler access denied")
+
+@api_router.get("/admin/profiles")
+async def list_profiles(x_profile: Optional[str] = Header(None)):
+    require_profiler_token(x_profile)
+    return profile_store.list()
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: str = Query("speedscope", pattern="^(speedscope|pstats|text)$"),
+    x_profile: Optional[str] = Header(None),
+):
+    require_profiler_token(x_profile)
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "text":
+        return PlainTextResponse(profile.top_functions())
+    if format == "pstats":
+        content, media_type, suffix = profile.to_pstats(), "application/octet-stream", "prof"
+    else:
+        content, media_type, suffix = json.dumps(profile.to_speedscope()), "application/json", "speedscope.json"
+    return Response(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.{suffix}"'},
+    )
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -77,6 +382,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if profiler_token or profile_sample_rate > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        admin_token=profiler_token,
+        exclude_prefix="/api/admin/profiles",
+        sample_rate=profile_sample_rate,
+    )
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -84,6 +398,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_employee_search():
+    global employee_index_task, pg_pool
+    if not database_url:
+        logger.warning("DATABASE_URL not set; employee search is disabled")
+        return
+    pg_pool = AsyncConnectionPool(database_url, min_size=1, max_size=4, open=False)
+    await pg_pool.open(wait=False)
+    employee_index_task = asyncio.create_task(sync_employee_index())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    if employee_index_task is not None:
+        employee_index_task.cancel()
+    if pg_pool is not None:
+        await pg_pool.close()
+    client.close()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Unit tests import backend modules (employee_search, profiling, ...) directly
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
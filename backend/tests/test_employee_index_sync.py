@@ -0,0 +1,251 @@
+"""
+Tests for keeping the server's employee search index in sync with PostgreSQL
+Tests: loop latency while applying changes, trigger notifications,
+change-checked polling without the trigger, search fallback
+All but the first need a scratch PostgreSQL database: TEST_DATABASE_URL=postgresql://... pytest
+"""
+import asyncio
+import gc
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+
+import psycopg
+import pytest
+from fastapi import HTTPException
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+
+import server  # noqa: E402
+from bench_employee_search import synthetic_employees  # noqa: E402
+from employee_search import EmployeeSearchIndex  # noqa: E402
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+requires_database = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+# The schema, including the notification trigger, exactly as init-db.js creates it
+INIT_DB = (Path(__file__).resolve().parent.parent / "init-db.js").read_text()
+SCHEMA_SQL = re.search(r"const schema = `(.*?)`;", INIT_DB, re.S).group(1)
+
+
+@pytest.fixture
+def database_url(monkeypatch):
+    """A throwaway schema holding the app's tables, wired into server.py"""
+    schema = f"index_sync_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+    url = make_conninfo(TEST_DATABASE_URL, options=f"-c search_path={schema}")
+    with psycopg.connect(url, autocommit=True) as conn:
+        conn.execute(SCHEMA_SQL)
+
+    monkeypatch.setattr(server, "database_url", url)
+    monkeypatch.setattr(server, "employee_index", EmployeeSearchIndex())
+    monkeypatch.setattr(server, "EMPLOYEE_INDEX_REFRESH_SECONDS", 0.05)
+    yield url
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def add_employee(conn, full_name, code, department="HR", status="Active"):
+    user_id = conn.execute(
+        "INSERT INTO users (email, password_hash, role) VALUES (%s, 'x', 'Employee') RETURNING id",
+        (f"{code.lower()}@dllc.com",),
+    ).fetchone()[0]
+    return str(conn.execute(
+        "INSERT INTO employees (user_id, full_name, employee_id, department, status)"
+        " VALUES (%s, %s, %s, %s, %s) RETURNING id",
+        (user_id, full_name, code, department, status),
+    ).fetchone()[0])
+
+
+async def eventually(check, timeout=5.0):
+    for _ in range(int(timeout / 0.02)):
+        if check():
+            return
+        await asyncio.sleep(0.02)
+    assert check()
+
+
+def ids(query, **filters):
+    return [hit["id"] for hit in server.employee_index.search(query, **filters)]
+
+
+def count_loads(monkeypatch) -> list:
+    loads = []
+    load = server.load_employee_index
+
+    async def counting_load(conn):
+        loads.append(1)
+        return await load(conn)
+
+    monkeypatch.setattr(server, "load_employee_index", counting_load)
+    return loads
+
+
+def run_with_sync(scenario):
+    async def main():
+        task = asyncio.create_task(server.sync_employee_index())
+        try:
+            await eventually(lambda: server.employee_index.ready)
+            await scenario()
+        finally:
+            task.cancel()
+
+    asyncio.run(main())
+
+
+class TestApplyingChanges:
+    """A batch of changes is applied without holding up searches"""
+
+    def test_event_loop_keeps_running(self, monkeypatch):
+        employees = list(synthetic_employees(3000, seed=1))
+        index = EmployeeSearchIndex()
+        index.build(employees[:2000])
+        monkeypatch.setattr(server, "employee_index", index)
+        monkeypatch.setattr(server, "EMPLOYEE_CHANGE_SLICE_SECONDS", 0.001)
+        # Long enough that a stray scheduler hiccup can't look like a stall
+        monkeypatch.setattr(server, "EMPLOYEE_CHANGE_REBUILD_MIN", 1000)
+        batch = employees[2000:2000 + server.employee_change_rebuild_count() - 1]
+
+        async def fetch_employees(conn, ids=None):
+            return batch
+
+        monkeypatch.setattr(server, "fetch_employees", fetch_employees)
+
+        async def main():
+            gaps = []
+            applying = asyncio.create_task(server.apply_employee_changes(None, {e["id"] for e in batch}))
+            last = started = time.perf_counter()
+            while not applying.done():
+                await asyncio.sleep(0)
+                gaps.append(time.perf_counter() - last)
+                last = time.perf_counter()
+            await applying
+            return gaps, last - started
+
+        # As load_employee_index does, keep the built index out of full collections
+        gc.freeze()
+        try:
+            gaps, total = asyncio.run(main())
+        finally:
+            gc.unfreeze()
+        assert server.employee_index is index
+        assert len(index) == 2000 + len(batch)
+        assert len(gaps) > 4
+        assert max(gaps) < total / 4
+
+
+@requires_database
+class TestTriggerNotifications:
+    """Changes made by the Node service reach the index through employee_changes"""
+
+    def test_insert_update_delete(self, database_url):
+        with psycopg.connect(database_url, autocommit=True) as conn:
+            sara = add_employee(conn, "Sara Shah", "DLLC00001")
+
+            async def scenario():
+                assert ids("sara") == [sara]
+
+                omar = add_employee(conn, "Omar Nair", "DLLC00002")
+                await eventually(lambda: ids("omar") == [omar])
+
+                conn.execute("UPDATE employees SET full_name = 'Sara Khan', status = 'Suspended' WHERE id = %s", (sara,))
+                await eventually(lambda: ids("khan", status="Suspended") == [sara])
+                assert ids("shah") == []
+
+                # Email lives on users
+                conn.execute(
+                    "UPDATE users SET email = 'zed.quill@dllc.com' WHERE id = (SELECT user_id FROM employees WHERE id = %s)",
+                    (sara,),
+                )
+                await eventually(lambda: ids("zed") == [sara])
+
+                conn.execute("DELETE FROM employees WHERE id = %s", (omar,))
+                await eventually(lambda: ids("omar") == [])
+                assert len(server.employee_index) == 1
+
+            run_with_sync(scenario)
+
+    def test_bulk_change_rebuilds_once(self, database_url, monkeypatch):
+        monkeypatch.setattr(server, "EMPLOYEE_CHANGE_REBUILD_MIN", 5)
+        loads = count_loads(monkeypatch)
+        with psycopg.connect(database_url, autocommit=True) as conn:
+            async def scenario():
+                for i in range(20):
+                    add_employee(conn, f"Priya Jones{i}", f"BULK{i:05d}")
+                await eventually(lambda: len(server.employee_index.search("priya", limit=100)) == 20)
+                assert len(loads) == 2
+
+            run_with_sync(scenario)
+
+
+@requires_database
+class TestPolling:
+    """Without the trigger, only the employees that changed are re-read"""
+
+    def test_reindexes_changed_employees(self, database_url, monkeypatch):
+        loads = count_loads(monkeypatch)
+        with psycopg.connect(database_url, autocommit=True) as conn:
+            conn.execute(f"DROP TRIGGER {server.EMPLOYEE_TRIGGER} ON employees")
+            sara = add_employee(conn, "Sara Shah", "DLLC00001")
+
+            async def scenario():
+                kiran = add_employee(conn, "Kiran Rao", "DLLC00002")
+                await eventually(lambda: ids("kiran") == [kiran])
+                conn.execute("UPDATE employees SET department = 'Legal' WHERE id = %s", (kiran,))
+                await eventually(lambda: ids("kiran", department="Legal") == [kiran])
+                conn.execute(
+                    "UPDATE users SET email = 'zed.quill@dllc.com' WHERE id = (SELECT user_id FROM employees WHERE id = %s)",
+                    (sara,),
+                )
+                await eventually(lambda: ids("zed") == [sara])
+                conn.execute("DELETE FROM employees WHERE id = %s", (sara,))
+                await eventually(lambda: ids("sara") == [])
+                assert len(server.employee_index) == 1
+                assert len(loads) == 1
+
+            run_with_sync(scenario)
+
+
+@requires_database
+class TestSearchFallback:
+    """Before the index is built, searches prefix-match in Postgres"""
+
+    def search(self, database_url, monkeypatch, q, **filters):
+        async def main():
+            pool = AsyncConnectionPool(database_url, min_size=1, max_size=1, open=False)
+            await pool.open()
+            monkeypatch.setattr(server, "pg_pool", pool)
+            try:
+                params = {"status": None, "department": None, "limit": 20, **filters}
+                return await server.search_employees(q, **params)
+            finally:
+                await pool.close()
+
+        return asyncio.run(main())
+
+    def test_prefix_terms(self, database_url, monkeypatch):
+        with psycopg.connect(database_url, autocommit=True) as conn:
+            sara = add_employee(conn, "Sara Shah", "DLLC00001", department="Legal")
+            add_employee(conn, "Eshwar Potnuru", "DLLC00002")
+
+        hits = self.search(database_url, monkeypatch, "sar")
+        assert [hit["id"] for hit in hits] == [sara]
+        assert hits[0]["email"] == "dllc00001@dllc.com"
+        assert len(self.search(database_url, monkeypatch, "potn")) == 1
+        assert [hit["id"] for hit in self.search(database_url, monkeypatch, "sh sa legal")] == [sara]
+        assert len(self.search(database_url, monkeypatch, "dllc")) == 2
+        assert self.search(database_url, monkeypatch, "sar", department="HR") == []
+        assert self.search(database_url, monkeypatch, "zzz") == []
+
+    def test_database_error_is_503(self, database_url, monkeypatch):
+        with psycopg.connect(database_url, autocommit=True) as conn:
+            conn.execute("DROP TABLE employees CASCADE")
+        with pytest.raises(HTTPException) as error:
+            self.search(database_url, monkeypatch, "sar")
+        assert error.value.status_code == 503
@@ -0,0 +1,249 @@
+"""
+Unit tests for the in-memory employee search index
+Tests: prefix/exact ranking, filters, AND queries, upsert/remove, typo fallback
+"""
+import random
+
+import pytest
+
+import employee_search
+from employee_search import EmployeeSearchIndex, PREFIX_CACHE_MIN_IDS, tokenize
+
+
+FIRST_NAMES = ["Anil", "Eshwar", "Priya", "Sara", "Sarah", "Kiran", "Omar", "Fatima", "Rahul", "Meera"]
+LAST_NAMES = ["Lalwani", "Potnuru", "Shah", "Khan", "Nair", "Jones", "Sharma", "Reddy"]
+DEPARTMENTS = ["Engineering", "Finance", "HR", "Legal", "Sales"]
+STATUSES = ["Active", "Suspended", "Terminated"]
+
+
+def make_employee(index, first, last, department="Engineering", status="Active"):
+    return {
+        "id": f"emp-{index}",
+        "full_name": f"{first} {last}",
+        "employee_id": f"DLLC{index:05d}",
+        "email": f"{first.lower()}.{last.lower()}{index}@dllc.com",
+        "department": department,
+        "status": status,
+    }
+
+
+def random_directory(size, seed=7):
+    rng = random.Random(seed)
+    return [
+        make_employee(
+            i, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+            rng.choice(DEPARTMENTS), rng.choice(STATUSES),
+        )
+        for i in range(size)
+    ]
+
+
+def brute_force_ranked(employees, query, status=None, department=None):
+    """(id, score) of employees where every query term prefixes one of their tokens, best first"""
+    terms = tokenize(query)
+    ranked = []
+    for employee in employees:
+        if status and employee["status"] != status:
+            continue
+        if department and employee["department"] != department:
+            continue
+        tokens = set()
+        for field in ("full_name", "employee_id", "email", "department"):
+            tokens.update(tokenize(employee[field]))
+        if all(any(token.startswith(term) for token in tokens) for term in terms):
+            score = sum(3.0 if term in tokens else 2.0 for term in terms)
+            ranked.append((-score, employee["full_name"], employee["id"]))
+    return [(employee_id, -neg_score) for neg_score, _, employee_id in sorted(ranked)]
+
+
+def brute_force(employees, query, status=None, department=None):
+    return {employee_id for employee_id, _ in brute_force_ranked(employees, query, status, department)}
+
+
+@pytest.fixture(scope="module")
+def directory():
+    employees = random_directory(PREFIX_CACHE_MIN_IDS * 3)
+    index = EmployeeSearchIndex()
+    index.build(employees)
+    return employees, index
+
+
+@pytest.fixture
+def small_index():
+    index = EmployeeSearchIndex()
+    index.build([
+        make_employee(1, "Sara", "Shah", "Legal"),
+        make_employee(2, "Sarah", "Khan", "Finance"),
+        make_employee(3, "Eshwar", "Potnuru", "Engineering"),
+        make_employee(4, "Priya", "Jones", "HR", status="Suspended"),
+    ])
+    return index
+
+
+class TestEmployeeSearchIndex:
+    """Behaviour of a hand-built directory"""
+
+    def test_prefix_match(self, small_index):
+        results = small_index.search("potn")
+        assert [r["id"] for r in results] == ["emp-3"]
+
+    def test_exact_token_ranks_above_prefix(self, small_index):
+        results = small_index.search("sara")
+        assert [r["id"] for r in results] == ["emp-1", "emp-2"]
+        assert results[0]["score"] > results[1]["score"]
+
+    def test_every_term_must_match(self, small_index):
+        assert [r["id"] for r in small_index.search("sara khan")] == ["emp-2"]
+        assert small_index.search("sara potnuru") == []
+
+    def test_employee_code_and_email(self, small_index):
+        assert [r["id"] for r in small_index.search("dllc00003")] == ["emp-3"]
+        assert [r["id"] for r in small_index.search("priya.jones4")] == ["emp-4"]
+
+    def test_filters(self, small_index):
+        assert [r["id"] for r in small_index.search("sar", department="Finance")] == ["emp-2"]
+        assert small_index.search("priya", status="Active") == []
+        assert [r["id"] for r in small_index.search("priya", status="Suspended")] == ["emp-4"]
+
+    def test_limit(self, small_index):
+        assert len(small_index.search("dllc", limit=2)) == 2
+
+    def test_upsert_and_remove(self, small_index):
+        small_index.upsert(make_employee(5, "Zed", "Quux", "Sales"))
+        assert [r["id"] for r in small_index.search("quu")] == ["emp-5"]
+
+        # Re-indexing drops the old tokens
+        small_index.upsert(make_employee(5, "Zed", "Corge", "Sales", status="Terminated"))
+        assert small_index.search("quu") == []
+        assert [r["id"] for r in small_index.search("corge", status="Terminated")] == ["emp-5"]
+
+        small_index.remove("emp-5")
+        assert small_index.search("corge") == []
+        assert len(small_index) == 4
+
+    def test_status_change(self, small_index):
+        employee = next(r for r in small_index.search("priya"))
+        small_index.upsert({**employee, "status": "Active"})
+        assert [r["id"] for r in small_index.search("priya", status="Active")] == [employee["id"]]
+        assert small_index.search("priya", status="Suspended") == []
+        assert small_index.search("priya")[0]["status"] == "Active"
+
+    def test_typo_swapped_letters(self, small_index):
+        results = small_index.search("jnoes")
+        assert [r["id"] for r in results] == ["emp-4"]
+
+    def test_typo_wrong_letter(self, small_index):
+        assert [r["id"] for r in small_index.search("potnaru")] == ["emp-3"]
+
+    def test_typo_combined_with_prefix(self, small_index):
+        assert [r["id"] for r in small_index.search("priya jnoes")] == ["emp-4"]
+
+    def test_no_match(self, small_index):
+        assert small_index.search("zzqx") == []
+        assert small_index.search("") == []
+
+
+class TestEmployeeSearchAgainstBruteForce:
+    """AND queries over a directory large enough to exercise cached prefixes"""
+
+    QUERIES = [
+        "sara shah legal", "priya khan", "sara shah", "kiran nair sales",
+        "a", "sa", "sara", "dllc", "eng", "omar j", "fatima reddy finance",
+    ]
+
+    @pytest.mark.parametrize("query", QUERIES)
+    def test_matches_brute_force(self, directory, query):
+        employees, index = directory
+        expected = brute_force(employees, query)
+        results = index.search(query, limit=len(employees))
+        assert {r["id"] for r in results} == expected
+
+    @pytest.mark.parametrize("query", ["sa", "sara shah", "dllc"])
+    def test_matches_brute_force_with_filters(self, directory, query):
+        employees, index = directory
+        expected = brute_force(employees, query, status="Active", department="Legal")
+        results = index.search(query, limit=len(employees), status="Active", department="Legal")
+        assert {r["id"] for r in results} == expected
+
+    # "dll" and "d" match every employee, which takes the name-ordered path
+    @pytest.mark.parametrize("query", ["a", "sa", "sara", "sara shah", "dll", "d", "dllc", "sara s", "s sara", "a s d"])
+    @pytest.mark.parametrize("limit", [1, 10, 100])
+    def test_ranking_matches_brute_force(self, directory, query, limit):
+        employees, index = directory
+        expected = brute_force_ranked(employees, query)[:limit]
+        results = index.search(query, limit=limit)
+        assert [(r["id"], r["score"]) for r in results] == expected
+
+    def test_cached_prefix_tracks_updates(self):
+        employees = random_directory(PREFIX_CACHE_MIN_IDS * 2, seed=11)
+        index = EmployeeSearchIndex()
+        index.build(employees)
+        index.search("s")  # populate the cache for a broad prefix
+
+        index.upsert(make_employee(99999, "Aaron", "Sven"))
+        index.remove(employees[0]["id"])
+        employees = employees[1:] + [make_employee(99999, "Aaron", "Sven")]
+
+        results = index.search("s", limit=len(employees))
+        assert {r["id"] for r in results} == brute_force(employees, "s")
+        results = index.search("s", limit=10)
+        assert [(r["id"], r["score"]) for r in results] == brute_force_ranked(employees, "s")[:10]
+
+    def test_broad_prefixes_are_cached_by_build(self, monkeypatch):
+        monkeypatch.setattr(employee_search, "WARM_PREFIX_MIN_IDS", 500)
+        employees = random_directory(PREFIX_CACHE_MIN_IDS * 2, seed=13)
+        index = EmployeeSearchIndex()
+        index.build(employees)
+        # Each spans several tokens: sara, sarah, sales, shah, sharma, ...
+        assert {"s", "sa", "sh"} <= set(index._prefix_cache)
+
+        index.upsert(make_employee(99999, "Aaron", "Sven"))
+        index.remove(employees[0]["id"])
+        employees = employees[1:] + [make_employee(99999, "Aaron", "Sven")]
+        for query in ("s", "sa", "sh"):
+            results = index.search(query, limit=10)
+            assert [(r["id"], r["score"]) for r in results] == brute_force_ranked(employees, query)[:10]
+
+    def test_built_prefixes_are_not_evicted(self, monkeypatch):
+        monkeypatch.setattr(employee_search, "WARM_PREFIX_MIN_IDS", 500)
+        monkeypatch.setattr(employee_search, "PREFIX_CACHE_MIN_IDS", 1)
+        monkeypatch.setattr(employee_search, "PREFIX_CACHE_SIZE", 2)
+        index = EmployeeSearchIndex()
+        index.build(random_directory(PREFIX_CACHE_MIN_IDS * 2, seed=13))
+        warm = set(index._prefix_cache)
+        for query in ("ka", "ki", "om", "pr", "me"):
+            index.search(query)
+        assert warm <= set(index._prefix_cache)
+
+    def test_incremental_updates_match_rebuild(self):
+        rng = random.Random(3)
+        employees = {e["id"]: e for e in random_directory(PREFIX_CACHE_MIN_IDS * 2, seed=5)}
+        index = EmployeeSearchIndex()
+        index.build(employees.values())
+        queries = ["s", "sa", "sara", "a", "dllc", "sara s", "kh", "jnoes"]
+        for query in queries:
+            index.search(query)  # warm the prefix cache so it has to be maintained
+
+        for step in range(300):
+            employee_id = rng.choice(list(employees))
+            if step % 3 == 0:
+                index.remove(employee_id)
+                del employees[employee_id]
+            elif step % 5 == 0:
+                employee = {**employees[employee_id], "status": rng.choice(STATUSES)}
+                index.upsert(employee)
+                employees[employee_id] = employee
+            else:
+                employee = make_employee(
+                    10000 + step, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                    rng.choice(DEPARTMENTS), rng.choice(STATUSES),
+                )
+                employee["id"] = employee_id if step % 3 == 1 else employee["id"]
+                index.upsert(employee)
+                employees[employee["id"]] = employee
+
+        rebuilt = EmployeeSearchIndex()
+        rebuilt.build(employees.values())
+        for query in queries:
+            assert index.search(query, limit=50) == rebuilt.search(query, limit=50)
+            assert index.search(query, limit=50, status="Active") == rebuilt.search(query, limit=50, status="Active")
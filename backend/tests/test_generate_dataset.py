@@ -0,0 +1,293 @@
+"""
+Tests for the synthetic dataset generator
+Tests: determinism, realistic leaves and attendance, status check spacing, option
+validation, COPY into Postgres, refusing to reload, --reset, --fast, search index
+notification, chunk error handling
+The Postgres tests need a scratch database: TEST_DATABASE_URL=postgresql://... pytest
+"""
+import os
+import re
+import uuid
+from datetime import date
+from itertools import islice
+from pathlib import Path
+
+import bcrypt
+import psycopg
+import pytest
+from psycopg.conninfo import make_conninfo
+from typer.testing import CliRunner
+
+import generate_dataset
+from generate_dataset import (
+    APPROVER_ROLES, DEFAULT_PASSWORD, STATUS_CHECKS, TABLES, TEAM_SIZE, DatasetGenerator, app, seeded_salt,
+)
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+needs_postgres = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+INIT_DB = (Path(__file__).resolve().parent.parent / "init-db.js").read_text()
+SCHEMA_SQL = re.search(r"const schema = `(.*?)`;", INIT_DB, re.S).group(1)
+
+
+def make_generator(seed=42, status_checks_per_day=24):
+    password_hash = bcrypt.hashpw(DEFAULT_PASSWORD.encode(), seeded_salt(seed, rounds=4)).decode()
+    return DatasetGenerator(1, seed, date(2025, 12, 31), password_hash, status_checks_per_day)
+
+
+def chunk_settings(database_url, **overrides):
+    settings = {
+        "database_url": database_url, "mongo_url": "mongodb://fake", "db_name": "test", "years": 1, "seed": 42,
+        "end_date": date(2025, 12, 31), "password_hash": "hash", "status_checks_per_day": 24, "batch_size": 100,
+    }
+    settings.update(overrides)
+    return settings
+
+
+@pytest.fixture
+def database_url():
+    """A throwaway schema holding the app's tables, as init-db.js creates them"""
+    schema = f"dataset_{uuid.uuid4().hex[:8]}"
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f"CREATE SCHEMA {schema}")
+    url = make_conninfo(TEST_DATABASE_URL, options=f"-c search_path={schema}")
+    with psycopg.connect(url, autocommit=True) as conn:
+        conn.execute(SCHEMA_SQL)
+    yield url
+    with psycopg.connect(TEST_DATABASE_URL, autocommit=True) as conn:
+        conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def table_counts(url):
+    with psycopg.connect(url) as conn:
+        return {table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0] for table in TABLES}
+
+
+def run(url, *args):
+    return CliRunner().invoke(
+        app, ["--database-url", url, "--processes", "1", "--status-checks-per-day", "0", *args],
+        env={"MONGO_URL": "", "DB_NAME": ""},
+    )
+
+
+class FakeStatusChecks:
+    def __init__(self):
+        self.inserted = []
+
+    def insert_many(self, docs, **kwargs):
+        self.inserted.extend(docs)
+
+
+class FakeMongoClient:
+    collection = None
+
+    def __init__(self, url):
+        self.closed = False
+
+    def __getitem__(self, name):
+        return {STATUS_CHECKS: FakeMongoClient.collection}
+
+    def close(self):
+        self.closed = True
+
+
+class TestDatasetGenerator:
+    """Generated rows"""
+
+    def test_same_seed_same_rows(self):
+        assert list(make_generator().employee_rows(0, 3)) == list(make_generator().employee_rows(0, 3))
+
+    def test_slices_of_whole_teams_match_whole_run(self, monkeypatch):
+        monkeypatch.setattr(generate_dataset, "TEAM_SIZE", 2)
+        whole = list(make_generator().employee_rows(0, 6))
+        sliced = list(make_generator().employee_rows(0, 2)) + list(make_generator().employee_rows(2, 6))
+        assert sliced == whole
+
+    def test_no_attendance_on_approved_leave(self):
+        rows = list(make_generator().employee_rows(0, 20))
+        on_leave = {
+            (leave["employee_id"], day)
+            for table, leave in rows if table == "leaves" and leave["status"] == "Approved"
+            for day in generate_dataset._days_between(leave["start_date"], leave["end_date"])
+        }
+        attended = {(row["employee_id"], row["date"]) for table, row in rows if table == "attendance"}
+        assert on_leave
+        assert not on_leave & attended
+
+    def test_leaves_do_not_overlap(self):
+        by_employee = {}
+        for table, leave in make_generator().employee_rows(0, 20):
+            if table == "leaves":
+                by_employee.setdefault(leave["employee_id"], []).append((leave["start_date"], leave["end_date"]))
+        for leaves in by_employee.values():
+            leaves.sort()
+            assert all(end < next_start for (_, end), (next_start, _) in zip(leaves, leaves[1:]))
+
+    def test_leaves_are_decided_by_team_approvers(self):
+        rows = list(make_generator().employee_rows(0, TEAM_SIZE))
+        users = {row["id"]: row for table, row in rows if table == "users"}
+        owners = {row["id"]: row["user_id"] for table, row in rows if table == "employees"}
+        leaves = [row for table, row in rows if table == "leaves"]
+        approvers = {user_id for user_id, user in users.items() if user["role"] in APPROVER_ROLES}
+        assert len(approvers) >= 2
+        decided = [leave for leave in leaves if leave["status"] != "Pending"]
+        assert decided
+        assert all(leave["approved_by"] in approvers for leave in decided)
+        assert all(leave["approved_by"] != owners[leave["employee_id"]] for leave in decided)
+        assert all(leave["approved_by"] is None for leave in leaves if leave["status"] == "Pending")
+
+    def test_users_precede_leaves(self):
+        written = set()
+        for table, row in make_generator().employee_rows(0, TEAM_SIZE * 2):
+            if table == "users":
+                written.add(row["id"])
+            elif table == "leaves" and row["approved_by"]:
+                assert row["approved_by"] in written
+
+    def test_password_hash_is_deterministic_and_valid(self):
+        assert seeded_salt(42) == seeded_salt(42)
+        assert seeded_salt(42) != seeded_salt(43)
+        password_hash = bcrypt.hashpw(DEFAULT_PASSWORD.encode(), seeded_salt(42, rounds=4))
+        assert bcrypt.checkpw(DEFAULT_PASSWORD.encode(), password_hash)
+
+    @pytest.mark.parametrize("per_day", [1, 7, 24, 1000, 86400])
+    def test_status_checks_per_day(self, per_day):
+        # Only the first day is materialised; a year at 86400/day would be
+        # tens of millions of dicts
+        generator = make_generator(status_checks_per_day=per_day)
+        first_day = [doc["timestamp"] for _, doc in islice(generator.status_check_rows(), per_day)]
+        assert len(first_day) == per_day
+        assert len(set(first_day)) == per_day
+        assert first_day == sorted(first_day)
+        assert all(ts.startswith(generator.days[0]) for ts in first_day)
+        assert next(islice(generator.status_check_rows(), per_day, None))[1]["timestamp"].startswith(generator.days[1])
+
+    def test_rows_match_table_columns(self):
+        for table, row in make_generator().employee_rows(0, 3):
+            assert tuple(row) == TABLES[table]
+
+    def test_status_check_total(self):
+        generator = make_generator(status_checks_per_day=3)
+        assert sum(1 for _ in generator.status_check_rows()) == 3 * len(generator.days)
+
+
+class TestGenerateCommand:
+    """Option validation, before anything connects"""
+
+    @pytest.fixture(autouse=True)
+    def no_database(self, monkeypatch):
+        def connect(*args, **kwargs):
+            raise AssertionError("should not connect")
+
+        monkeypatch.setattr(generate_dataset.psycopg, "connect", connect)
+
+    @pytest.mark.parametrize("end_date", ["2025-13-01", "yesterday", ""])
+    def test_invalid_end_date(self, end_date):
+        result = run("postgresql://fake", "--end-date", end_date)
+        assert result.exit_code == 2
+        assert "--end-date" in result.output
+
+    def test_history_before_year_one(self):
+        assert run("postgresql://fake", "--end-date", "0001-06-01").exit_code == 2
+
+    def test_too_many_status_checks(self):
+        assert run("postgresql://fake", "--status-checks-per-day", "86401").exit_code == 2
+
+    def test_database_url_required(self):
+        result = CliRunner().invoke(app, [], env={"DATABASE_URL": ""})
+        assert result.exit_code == 2
+        assert "DATABASE_URL" in result.output
+
+
+class TestStatusChecks:
+    """Status checks go to MongoDB in insert_many batches"""
+
+    def test_loads_every_status_check(self, monkeypatch):
+        FakeMongoClient.collection = FakeStatusChecks()
+        monkeypatch.setattr(generate_dataset, "MongoClient", FakeMongoClient)
+        counts = generate_dataset._load_status_checks(chunk_settings(None, status_checks_per_day=3))
+        assert counts == {STATUS_CHECKS: 3 * 365}
+        assert len(FakeMongoClient.collection.inserted) == 3 * 365
+        assert all(doc["synthetic"] for doc in FakeMongoClient.collection.inserted)
+
+
+@needs_postgres
+class TestPostgresLoad:
+    """COPY into the schema the Node API serves"""
+
+    def test_loads_rows(self, database_url):
+        result = run(database_url, "--employees", "5", "--batch-size", "500")
+        assert result.exit_code == 0, result.output
+        counts = table_counts(database_url)
+        expected = {table: 0 for table in TABLES}
+        for table, _ in make_generator().employee_rows(0, 5):
+            expected[table] += 1
+        assert counts == expected
+        with psycopg.connect(database_url) as conn:
+            email, full_name = conn.execute(
+                "SELECT u.email, e.full_name FROM employees e JOIN users u ON u.id = e.user_id"
+                " WHERE e.employee_id = 'SYN000001'"
+            ).fetchone()
+            assert email.endswith("@synthetic.dllc.com")
+            allowances = conn.execute("SELECT allowances FROM salary_payroll LIMIT 1").fetchone()[0]
+            assert set(allowances) == {"housing", "transport"}
+
+    def test_refuses_to_load_twice(self, database_url):
+        assert run(database_url, "--employees", "2").exit_code == 0
+        before = table_counts(database_url)
+        result = run(database_url, "--employees", "2")
+        assert result.exit_code == 1
+        assert "--reset" in result.output
+        assert table_counts(database_url) == before
+
+    def test_reset_replaces_only_synthetic_rows(self, database_url):
+        with psycopg.connect(database_url, autocommit=True) as conn:
+            conn.execute("INSERT INTO users (email, password_hash, role) VALUES ('admin@dllc.com', 'x', 'Admin')")
+        assert run(database_url, "--employees", "3").exit_code == 0
+        result = run(database_url, "--employees", "2", "--reset")
+        assert result.exit_code == 0, result.output
+        counts = table_counts(database_url)
+        assert counts["users"] == 3
+        assert counts["employees"] == 2
+
+    def test_search_index_gets_one_rebuild_request(self, database_url):
+        with psycopg.connect(database_url, autocommit=True) as listener:
+            listener.execute(f"LISTEN {generate_dataset.SEARCH_CHANNEL}")
+            assert run(database_url, "--employees", "5").exit_code == 0
+            payloads = [notify.payload for notify in listener.notifies(timeout=0.5)]
+            assert payloads == [generate_dataset.SEARCH_REBUILD_PAYLOAD]
+            assert generate_dataset._search_trigger_enabled(listener)
+
+    def test_fast_load_restores_indexes_and_foreign_keys(self, database_url):
+        def schema(conn):
+            return (
+                conn.execute("SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema()").fetchall(),
+                conn.execute(
+                    "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint"
+                    " WHERE connamespace = current_schema()::regnamespace"
+                ).fetchall(),
+            )
+
+        with psycopg.connect(database_url) as conn:
+            before = schema(conn)
+        result = run(database_url, "--employees", "5", "--fast")
+        assert result.exit_code == 0, result.output
+        with psycopg.connect(database_url) as conn:
+            assert sorted(map(sorted, schema(conn))) == sorted(map(sorted, before))
+        assert table_counts(database_url)["attendance"] > 0
+
+    def test_generation_error_is_not_masked(self, database_url, monkeypatch):
+        def broken_rows(self, start, stop):
+            yield "users", {"id": str(uuid.uuid4()), "email": "x@synthetic.dllc.com", "password_hash": "x",
+                            "role": "Employee", "created_at": "2025-01-01T00:00:00"}
+            raise ValueError("generator bug")
+
+        monkeypatch.setattr(DatasetGenerator, "employee_rows", broken_rows)
+        with pytest.raises(ValueError, match="generator bug"):
+            generate_dataset._load_chunk(((0, 1), chunk_settings(database_url, batch_size=1)))
+
+    def test_insert_error_is_raised(self, database_url):
+        task = ((0, 1), chunk_settings(database_url))
+        generate_dataset._load_chunk(task)
+        with pytest.raises(psycopg.errors.UniqueViolation):
+            generate_dataset._load_chunk(task)
@@ -0,0 +1,244 @@
+"""
+Unit tests for the opt-in request profiler
+Tests: top-N store, token check, middleware, pstats and speedscope exports
+"""
+import cProfile
+import json
+import pstats
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiling import (
+    PROFILE_HEADER, PROFILE_ID_HEADER, PROFILE_STATUS_HEADER, ProfileStore, ProfilingMiddleware, RequestProfile,
+    token_matches,
+)
+
+TOKEN = "s3cret-token"
+
+
+def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+
+def busy_work():
+    fib(16)
+    json.dumps([{"value": i} for i in range(2000)])
+    sorted(range(5000), key=lambda x: -x)
+
+
+def make_profile(wall_s=0.1, cpu_s=0.05, requested=False):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    busy_work()
+    profiler.disable()
+    profiler.create_stats()
+    return RequestProfile("GET", "/api/test", 200, wall_s, cpu_s, profiler.stats, requested)
+
+
+def make_routes():
+    app = FastAPI()
+
+    @app.get("/api/work")
+    async def work():
+        busy_work()
+        return {"ok": True}
+
+    @app.get("/api/fail")
+    async def fail():
+        raise RuntimeError("boom")
+
+    @app.get("/api/admin/profiles")
+    async def admin():
+        return {}
+
+    return app
+
+
+def make_app(store, sample_rate=0.0):
+    app = make_routes()
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=store,
+        admin_token=TOKEN,
+        sample_rate=sample_rate,
+        exclude_prefix="/api/admin/profiles",
+    )
+    return app
+
+
+class TestTokenMatches:
+    """Admin token comparison"""
+
+    def test_matches(self):
+        assert token_matches(TOKEN, TOKEN)
+
+    def test_rejects_wrong_or_missing(self):
+        assert not token_matches(TOKEN, "wrong")
+        assert not token_matches(TOKEN, None)
+        assert not token_matches(TOKEN, "")
+
+    def test_disabled_without_configured_token(self):
+        assert not token_matches(None, "anything")
+        assert not token_matches("", "")
+
+
+class TestProfileStore:
+    """Requested profiles ring, slowest recent sampled profiles"""
+
+    def test_keeps_slowest_sampled(self):
+        store = ProfileStore(3)
+        slow = make_profile(wall_s=5.0)
+        store.add(slow)
+        for i in range(20):
+            store.add(make_profile(wall_s=0.01 * (i + 1)))
+
+        walls = [p["wall_ms"] for p in store.list()]
+        assert len(store) == 3
+        assert walls == [5000.0, 200.0, 190.0]
+        assert store.get(slow.id) is slow
+
+    def test_evicted_profile_is_gone(self):
+        store = ProfileStore(1)
+        fast = make_profile(wall_s=0.01)
+        store.add(fast)
+        store.add(make_profile(wall_s=0.02))
+        assert store.get(fast.id) is None
+
+    def test_faster_sampled_profile_is_not_kept(self):
+        store = ProfileStore(1)
+        slow = make_profile(wall_s=1.0)
+        assert store.add(slow)
+        assert not store.add(make_profile(wall_s=0.5))
+        assert [p["id"] for p in store.list()] == [slow.id]
+
+    def test_requested_profile_is_always_kept(self):
+        store = ProfileStore(1)
+        store.add(make_profile(wall_s=5.0))
+        fast = make_profile(wall_s=0.01, requested=True)
+        assert store.add(fast)
+        assert store.get(fast.id) is fast
+        assert len(store) == 2
+
+    def test_requested_profiles_are_a_ring(self):
+        store = ProfileStore(2)
+        profiles = [make_profile(wall_s=1.0 - 0.1 * i, requested=True) for i in range(3)]
+        for profile in profiles:
+            store.add(profile)
+        assert store.get(profiles[0].id) is None
+        assert {p["id"] for p in store.list()} == {profiles[1].id, profiles[2].id}
+
+    def test_sampled_profiles_age_out(self, monkeypatch):
+        store = ProfileStore(1, max_age_s=60)
+        old = make_profile(wall_s=5.0)
+        store.add(old)
+        monkeypatch.setattr(old, "recorded_at", old.recorded_at - 61)
+        recent = make_profile(wall_s=0.01)
+        assert store.add(recent)
+        assert store.get(old.id) is None
+        assert store.get(recent.id) is recent
+
+
+class TestExports:
+    """pstats and speedscope downloads"""
+
+    def test_pstats_loads(self, tmp_path):
+        profile = make_profile()
+        path = tmp_path / "profile.prof"
+        path.write_bytes(profile.to_pstats())
+        stats = pstats.Stats(str(path))
+        assert any(func[2] == "fib" for func in stats.stats)
+
+    def test_text_report(self):
+        assert "busy_work" in make_profile().top_functions()
+
+    def test_speedscope_weights_add_up_to_total_time(self):
+        profile = make_profile()
+        document = profile.to_speedscope()
+        sampled = document["profiles"][0]
+        frames = document["shared"]["frames"]
+
+        total_tt = sum(tt for _, _, tt, _, _ in profile.stats.values())
+        assert sum(sampled["weights"]) == pytest.approx(total_tt, rel=0.02)
+        assert sampled["endValue"] == pytest.approx(sum(sampled["weights"]))
+        assert len(sampled["samples"]) == len(sampled["weights"])
+        assert all(0 <= index < len(frames) for stack in sampled["samples"] for index in stack)
+        assert any(frame["name"] == "fib" for frame in frames)
+
+    def test_speedscope_is_json(self):
+        json.dumps(make_profile().to_speedscope())
+
+
+class TestProfilingMiddleware:
+    """Which requests get profiled"""
+
+    def test_not_profiled_by_default(self):
+        store = ProfileStore(5)
+        response = TestClient(make_app(store)).get("/api/work")
+        assert response.status_code == 200
+        assert PROFILE_ID_HEADER not in response.headers
+        assert len(store) == 0
+
+    def test_profiled_with_admin_token(self):
+        store = ProfileStore(5)
+        response = TestClient(make_app(store)).get("/api/work", headers={PROFILE_HEADER: TOKEN})
+        assert response.status_code == 200
+        profile = store.get(response.headers[PROFILE_ID_HEADER])
+        assert profile is not None
+        assert profile.path == "/api/work"
+        assert any(func[2] == "fib" for func in profile.stats)
+        summary = profile.summary()
+        assert summary["requested"]
+        assert summary["wall_ms"] >= summary["cpu_ms"] > 0
+
+    def test_requested_profile_survives_full_buffer(self):
+        store = ProfileStore(1)
+        store.add(make_profile(wall_s=60.0))
+        response = TestClient(make_app(store)).get("/api/work", headers={PROFILE_HEADER: TOKEN})
+        assert store.get(response.headers[PROFILE_ID_HEADER]) is not None
+
+    def test_no_id_header_when_sampled_profile_is_dropped(self):
+        store = ProfileStore(1)
+        store.add(make_profile(wall_s=60.0))
+        response = TestClient(make_app(store, sample_rate=1.0)).get("/api/work")
+        assert response.status_code == 200
+        assert PROFILE_ID_HEADER not in response.headers
+        assert len(store) == 1
+
+    def test_wrong_token_is_not_profiled(self):
+        store = ProfileStore(5)
+        TestClient(make_app(store)).get("/api/work", headers={PROFILE_HEADER: "wrong"})
+        assert len(store) == 0
+
+    def test_sampling(self):
+        store = ProfileStore(5)
+        client = TestClient(make_app(store, sample_rate=1.0))
+        client.get("/api/work")
+        assert len(store) == 1
+
+    def test_admin_endpoints_are_excluded(self):
+        store = ProfileStore(5)
+        TestClient(make_app(store)).get("/api/admin/profiles", headers={PROFILE_HEADER: TOKEN})
+        assert len(store) == 0
+
+    def test_busy_profiler_is_reported(self):
+        store = ProfileStore(5)
+        middleware = ProfilingMiddleware(make_routes(), store=store, admin_token=TOKEN, sample_rate=1.0)
+        middleware._active = True
+        client = TestClient(middleware)
+
+        response = client.get("/api/work", headers={PROFILE_HEADER: TOKEN})
+        assert response.status_code == 200
+        assert response.headers[PROFILE_STATUS_HEADER] == "busy"
+        assert PROFILE_ID_HEADER not in response.headers
+        # Sampled requests are skipped quietly
+        assert PROFILE_STATUS_HEADER not in client.get("/api/work").headers
+        assert len(store) == 0
+
+    def test_failed_request_frees_the_profiler(self):
+        store = ProfileStore(5)
+        client = TestClient(make_app(store), raise_server_exceptions=False)
+        assert client.get("/api/fail", headers={PROFILE_HEADER: TOKEN}).status_code == 500
+        response = client.get("/api/work", headers={PROFILE_HEADER: TOKEN})
+        assert store.get(response.headers[PROFILE_ID_HEADER]) is not None